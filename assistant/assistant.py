@@ -1,19 +1,24 @@
 from flask import Flask
 from flask_smorest import Api
 
-from config.config import Config
-from extensions.llm import LLM
-from extensions.tavily_tool import Tavily
-from extensions.vector_store import VectorStore
-from resources.v1.endpoints.analyze_pdf import blp as analyze_pdf_blueprint
-from resources.v1.endpoints.chat_rag import blp as chat_rag_blueprint
-from resources.v1.endpoints.shopping_advisor import blp as shopping_advisor_blueprint
+from .config.config import Config
+from .extensions.job_queue import JobQueue
+from .extensions.llm import LLM
+from .extensions.statement_store import StatementStore
+from .extensions.tavily_tool import Tavily
+from .extensions.vector_store import VectorStore
+from .resources.v1.endpoints.analyze_pdf import blp as analyze_pdf_blueprint
+from .resources.v1.endpoints.chat_rag import blp as chat_rag_blueprint
+from .resources.v1.endpoints.shopping_advisor import blp as shopping_advisor_blueprint
+from .resources.v1.endpoints.stats import blp as stats_blueprint
 
 app = Flask(__name__)
 
 app.config.from_object(Config)
 
 LLM.init_app()
+StatementStore.init_app()
+JobQueue.init_app()
 Tavily.init_app()
 VectorStore.init_app()
 
@@ -24,3 +29,4 @@ API_V1_PREFIX = "/api/v1"
 api.register_blueprint(chat_rag_blueprint, url_prefix=API_V1_PREFIX)
 api.register_blueprint(shopping_advisor_blueprint, url_prefix=API_V1_PREFIX)
 api.register_blueprint(analyze_pdf_blueprint, url_prefix=API_V1_PREFIX)
+api.register_blueprint(stats_blueprint, url_prefix=API_V1_PREFIX)
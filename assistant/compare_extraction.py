@@ -0,0 +1,57 @@
+"""Compare PDF extraction backends on a corpus of statements.
+
+Usage: python -m assistant.compare_extraction statements/*.pdf [--baseline pdfplumber] [--candidate fast]
+"""
+import argparse
+import difflib
+import time
+
+from .services.pdf_extraction import EXTRACTION_BACKENDS, extract_markdown
+from .services.transactions import parse_transactions
+
+
+def timed_extraction(path: str, backend: str) -> tuple[str, float]:
+    started = time.perf_counter()
+    with open(path, "rb") as pdf_file:
+        markdown = extract_markdown(pdf_file, backend)
+    return markdown, time.perf_counter() - started
+
+
+def compare(path: str, baseline: str, candidate: str) -> dict:
+    baseline_markdown, baseline_seconds = timed_extraction(path, baseline)
+    candidate_markdown, candidate_seconds = timed_extraction(path, candidate)
+    baseline_transactions = parse_transactions(baseline_markdown)
+    candidate_transactions = parse_transactions(candidate_markdown)
+    return {
+        "path": path,
+        "baseline_seconds": baseline_seconds,
+        "candidate_seconds": candidate_seconds,
+        "line_similarity": difflib.SequenceMatcher(
+            None, baseline_markdown.splitlines(), candidate_markdown.splitlines(), autojunk=False
+        ).ratio(),
+        "baseline_expenses": (len(baseline_transactions), float(baseline_transactions.amounts.sum())),
+        "candidate_expenses": (len(candidate_transactions), float(candidate_transactions.amounts.sum())),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--baseline", choices=EXTRACTION_BACKENDS, default="pdfplumber")
+    parser.add_argument("--candidate", choices=EXTRACTION_BACKENDS, default="fast")
+    args = parser.parse_args()
+
+    mismatches = 0
+    for path in args.paths:
+        result = compare(path, args.baseline, args.candidate)
+        expenses_match = result["baseline_expenses"] == result["candidate_expenses"]
+        mismatches += not expenses_match
+        print(f"{result['path']}: {result['baseline_seconds']:.2f}s -> {result['candidate_seconds']:.2f}s, "
+              f"line similarity {result['line_similarity']:.3f}, "
+              f"expenses {result['baseline_expenses']} vs {result['candidate_expenses']}"
+              f"{'' if expenses_match else '  MISMATCH'}")
+    print(f"{len(args.paths) - mismatches}/{len(args.paths)} statements with identical parsed expenses")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+import os
+
+
 class Config:
     PROPAGATE_EXCEPTIONS = True
     API_TITLE = "Assistant Microservice"
@@ -6,3 +9,5 @@ class Config:
     OPENAPI_URL_PREFIX = "/"
     OPENAPI_SWAGGER_UI_PATH = "/swagger-ui"
     OPENAPI_SWAGGER_UI_URL = "https://cdn.jsdelivr.net/npm/swagger-ui-dist/"
+    # Rejects oversized uploads from the Content-Length header before the body is read.
+    MAX_CONTENT_LENGTH = int(os.getenv("MAX_CONTENT_LENGTH", str(26 * 1024 * 1024)))
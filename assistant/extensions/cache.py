@@ -0,0 +1,108 @@
+import json
+import sqlite3
+import time
+import unicodedata
+from threading import Lock
+
+from common.cache import TTLCache
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+class SqliteTable:
+    """One table of a SQLite file shared by the gunicorn workers, used as the disk tier of a cache.
+
+    Disk errors, typically "database is locked" under write contention, are counted and swallowed: a failed read is a
+    miss and a failed write is skipped, so the cache never fails the request it is meant to speed up.
+    """
+
+    # How long a statement waits for another worker's write lock before it gives up.
+    BUSY_TIMEOUT_MS = 1000
+
+    def __init__(self, path: str, table: str, columns: str):
+        # One connection shared by the request threads; WAL lets the other workers read while one writes.
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute(f"PRAGMA busy_timeout={self.BUSY_TIMEOUT_MS}")
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns})")
+        self._lock = Lock()
+        self.hits = 0
+        self.errors = 0
+
+    def fetch_one(self, query: str, parameters: tuple) -> tuple | None:
+        with self._lock:
+            try:
+                row = self._connection.execute(query, parameters).fetchone()
+            except sqlite3.Error:
+                self.errors += 1
+                return None
+            if row is not None:
+                self.hits += 1
+            return row
+
+    def execute(self, statement: str, parameters: tuple = ()):
+        with self._lock:
+            try:
+                self._connection.execute(statement, parameters)
+            except sqlite3.Error:
+                self.errors += 1
+
+    def counters(self) -> tuple[int, int]:
+        with self._lock:
+            return self.hits, self.errors
+
+
+def tiered_stats(memory: TTLCache, disk: SqliteTable | None) -> dict:
+    memory_stats = memory.stats()
+    disk_hits, disk_errors = disk.counters() if disk is not None else (0, 0)
+    lookups = memory_stats["hits"] + memory_stats["misses"]
+    hits = memory_stats["hits"] + disk_hits
+    return {
+        "memory_entries": memory_stats["entries"],
+        "memory_hits": memory_stats["hits"],
+        "disk_hits": disk_hits,
+        "disk_errors": disk_errors,
+        "misses": lookups - hits,
+        "hit_rate": hits / lookups if lookups else 0.0,
+    }
+
+
+class PersistentTTLCache:
+    """TTLCache in front of a SQLite table of JSON values, so entries survive restarts and are shared by workers."""
+
+    def __init__(self, max_entries: int, path: str | None, table: str):
+        self._memory = TTLCache(max_entries)
+        self._table = table
+        self._disk = None
+        self._last_purge = 0.0
+        if path:
+            self._disk = SqliteTable(path, table, "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL")
+
+    def get(self, key: str):
+        value = self._memory.get(key)
+        if value is not None or self._disk is None:
+            return value
+        now = time.time()
+        row = self._disk.fetch_one(f"SELECT value, expires_at FROM {self._table} WHERE key = ? AND expires_at > ?",
+                                   (key, now))
+        if row is None:
+            return None
+        value = json.loads(row[0])
+        self._memory.set(key, value, row[1] - now)
+        return value
+
+    def set(self, key: str, value, ttl: float):
+        self._memory.set(key, value, ttl)
+        if self._disk is None or ttl <= 0:
+            return
+        now = time.time()
+        self._disk.execute(f"INSERT OR REPLACE INTO {self._table} (key, value, expires_at) VALUES (?, ?, ?)",
+                           (key, json.dumps(value, ensure_ascii=False), now + ttl))
+        if now - self._last_purge > 60:
+            self._last_purge = now
+            self._disk.execute(f"DELETE FROM {self._table} WHERE expires_at <= ?", (now,))
+
+    def stats(self) -> dict:
+        return tiered_stats(self._memory, self._disk)
@@ -0,0 +1,67 @@
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from common.cache import TTLCache
+
+from .cache import SqliteTable, normalize_query, tiered_stats
+
+
+class CachedEmbeddings(Embeddings):
+    """Caches query embeddings by normalized text: an in-memory LRU in front of a SQLite file of float32 blobs.
+
+    Document embeddings are passed through untouched; only the per-request query path is cached.
+    """
+
+    def __init__(self, embedder: Embeddings, model: str, max_entries: int, path: str | None):
+        self._embedder = embedder
+        self._model = model
+        self._memory = TTLCache(max_entries)
+        self._disk = SqliteTable(path, "embeddings", "key TEXT PRIMARY KEY, vector BLOB NOT NULL") if path else None
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self._model}\n{normalize_query(text)}".encode("utf-8")).hexdigest()
+
+    def embed_query(self, text: str) -> list[float]:
+        key = self._key(text)
+        vector = self._memory.get(key)
+        if vector is not None:
+            return vector
+
+        vector = self._load(key)
+        if vector is None:
+            # Rounded to float32 up front so a vector is identical whichever tier it is served from.
+            vector = np.asarray(self._embedder.embed_query(text), dtype=np.float32).tolist()
+            self._store(key, vector)
+        self._memory.set(key, vector, float("inf"))
+        return vector
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._embedder.embed_documents(texts)
+
+    def _load(self, key: str) -> list[float] | None:
+        if self._disk is None:
+            return None
+        row = self._disk.fetch_one("SELECT vector FROM embeddings WHERE key = ?", (key,))
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32).tolist()
+
+    def _store(self, key: str, vector: list[float]):
+        if self._disk is None:
+            return
+        blob = np.asarray(vector, dtype=np.float32).tobytes()
+        self._disk.execute("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", (key, blob))
+
+    def stats(self) -> dict:
+        return tiered_stats(self._memory, self._disk)
+
+
+def build_cached_embedder(embedder: Embeddings, model: str) -> CachedEmbeddings:
+    path = None
+    if os.getenv("EMBEDDING_CACHE_PERSIST", "true").lower() == "true":
+        path = os.getenv("EMBEDDING_CACHE_PATH") or os.path.join(tempfile.gettempdir(), "query_embeddings.sqlite3")
+    return CachedEmbeddings(embedder, model, int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "10000")), path)
@@ -0,0 +1,118 @@
+import json
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from .statement_store import secure_delete
+
+JOB_ID_LENGTH = 32
+
+
+class JobQueueFullError(RuntimeError):
+    pass
+
+
+class JobQueue:
+    """Bounded background pool for long analyses.
+
+    Job records are JSON files in a shared directory, so any gunicorn worker can answer a status poll for a job
+    running in another one. Expired records are overwritten before they are deleted.
+    """
+    _executor = None
+    _directory = None
+    _capacity = 0
+    _pending = 0
+    _pending_lock = Lock()
+    _ttl = 0
+    _purge_lock = Lock()
+    _last_purge = 0.0
+
+    @classmethod
+    def init_app(cls):
+        if cls._executor is not None:
+            return
+        workers = int(os.getenv("PDF_JOB_WORKERS", "2"))
+        cls._capacity = workers + int(os.getenv("PDF_JOB_MAX_QUEUED", "16"))
+        cls._ttl = float(os.getenv("PDF_JOB_RESULT_TTL", "3600"))
+        cls._directory = os.getenv("PDF_JOB_DIR") or os.path.join(tempfile.gettempdir(), "analysis_jobs")
+        os.makedirs(cls._directory, mode=0o700, exist_ok=True)
+        cls._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis-job")
+
+    @classmethod
+    def submit(cls, function, *args) -> str:
+        """Queue `function(*args)`; its return value becomes the job result. Raises JobQueueFullError when full."""
+        if cls._executor is None:
+            raise RuntimeError("Job queue not initialized. Call init_app first.")
+        with cls._pending_lock:
+            if cls._pending >= cls._capacity:
+                raise JobQueueFullError(f"{cls._pending} analyses are already queued or running, try again later")
+            cls._pending += 1
+
+        job_id = uuid.uuid4().hex
+        cls._write(job_id, {"job_id": job_id, "status": "queued"})
+        cls._executor.submit(cls._run, job_id, function, args)
+        cls._purge_expired()
+        return job_id
+
+    @classmethod
+    def get(cls, job_id: str) -> dict | None:
+        if cls._directory is None:
+            raise RuntimeError("Job queue not initialized. Call init_app first.")
+        if len(job_id) != JOB_ID_LENGTH or not job_id.isalnum():
+            return None
+        try:
+            with open(cls._path(job_id), encoding="utf-8") as job_file:
+                return json.load(job_file)
+        except FileNotFoundError:
+            return None
+
+    @classmethod
+    def stats(cls) -> dict:
+        with cls._pending_lock:
+            return {"pending": cls._pending, "capacity": cls._capacity}
+
+    @classmethod
+    def _run(cls, job_id: str, function, args):
+        cls._write(job_id, {"job_id": job_id, "status": "running"})
+        try:
+            cls._write(job_id, {"job_id": job_id, "status": "succeeded", "result": function(*args)})
+        except Exception as error:
+            cls._write(job_id, {"job_id": job_id, "status": "failed", "error": str(error)})
+        finally:
+            with cls._pending_lock:
+                cls._pending -= 1
+
+    @classmethod
+    def _path(cls, job_id: str) -> str:
+        return os.path.join(cls._directory, f"{job_id}.json")
+
+    @classmethod
+    def _write(cls, job_id: str, record: dict):
+        # Write then rename, so a concurrent poll never reads a half-written record. Owner-only, like the statements.
+        temporary_path = f"{cls._path(job_id)}.tmp"
+        file_descriptor = os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(file_descriptor, "w", encoding="utf-8") as job_file:
+            json.dump(record, job_file, ensure_ascii=False)
+        os.replace(temporary_path, cls._path(job_id))
+
+    @classmethod
+    def _purge_expired(cls):
+        now = time.time()
+        with cls._purge_lock:
+            if now - cls._last_purge < 60:
+                return
+            cls._last_purge = now
+        for entry in os.scandir(cls._directory):
+            # Temporary files left by a crash between the write and the rename hold records too.
+            if not entry.name.endswith((".json", ".json.tmp")):
+                continue
+            try:
+                expired = now - entry.stat().st_mtime > cls._ttl
+            except FileNotFoundError:
+                continue
+            if expired:
+                # Finished records hold the full statement analysis, so they get the same wiping as the statements.
+                secure_delete(entry.path)
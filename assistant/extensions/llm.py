@@ -1,16 +1,32 @@
-from langchain_openai import ChatOpenAI
+from common.llm import ProfiledLLM
 
+# Named settings nodes ask for with LLM.get_llm(profile). Any field can be overridden per profile with
+# LLM_<PROFILE>_MODEL, LLM_<PROFILE>_MAX_TOKENS, LLM_<PROFILE>_TIMEOUT and LLM_<PROFILE>_MAX_RETRIES.
+LLM_PROFILES = {
+    "default": {"model": "gpt-4o-mini", "max_tokens": None, "timeout": 60, "max_retries": 2, "stop": None},
+    # Single-line search queries.
+    "query_writer": {"model": "gpt-4o-mini", "max_tokens": 64, "timeout": 15, "max_retries": 1, "stop": ["\n"]},
+    # Expense lists extracted from one chunk of a long statement.
+    "chunk_extractor": {"model": "gpt-4o-mini", "max_tokens": 2048, "timeout": 120, "max_retries": 2, "stop": None},
+    # Long-form answers shown to the user.
+    "generator": {"model": "gpt-4o-mini", "max_tokens": 1500, "timeout": 120, "max_retries": 2, "stop": None},
+    # Bank statement analyses, whose expense tables grow with the statement.
+    "statement_analyzer": {"model": "gpt-4o-mini", "max_tokens": 4096, "timeout": 180, "max_retries": 2,
+                           "stop": None},
+}
 
-class LLM:
-    _llm_instance = None
+# (priority, expected tokens per call) used by the shared rate limiter: lower priorities are admitted first, and the
+# expected tokens are reserved up front and then corrected with the usage OpenAI reports. The orchestrator's
+# classifiers use priority 0.
+RATE_LIMIT_PROFILES = {
+    "default": (1, 2000),
+    "query_writer": (1, 500),
+    "chunk_extractor": (2, 6000),
+    "generator": (1, 4000),
+    "statement_analyzer": (1, 8000),
+}
 
-    @classmethod
-    def init_app(cls):
-        if cls._llm_instance is None:
-            cls._llm_instance = ChatOpenAI(model="gpt-4o-mini", temperature=0)
 
-    @classmethod
-    def get_llm(cls):
-        if cls._llm_instance is None:
-            raise RuntimeError("Database not initialized. Call init_app first")
-        return cls._llm_instance
+class LLM(ProfiledLLM):
+    PROFILES = LLM_PROFILES
+    RATE_LIMITS = RATE_LIMIT_PROFILES
@@ -0,0 +1,177 @@
+import fcntl
+import json
+import os
+import time
+from contextlib import contextmanager
+from threading import Event, Lock, Thread
+
+import numpy as np
+from bson import json_util
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+TEXT_KEY = "text"
+EMBEDDING_KEY = "embedding"
+
+
+def cosine_relevance(similarity: np.ndarray) -> np.ndarray:
+    # Same scale as Atlas Vector Search with the cosine similarity function.
+    return (1 + similarity) / 2
+
+
+class LocalVectorIndex:
+    """In-process replica of a vector collection.
+
+    The snapshot directory holds the unit-normalized embeddings as one contiguous float32 `.npy` matrix, memory-mapped
+    on load, next to the texts and metadata. Writers serialize on a lock file, so every gunicorn worker can refresh
+    the same directory and the others simply reload it.
+    """
+
+    def __init__(self, directory: str, embedder: Embeddings, collection=None):
+        self._directory = directory
+        self._embedder = embedder
+        self._collection = collection
+        self._lock = Lock()
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._documents = []
+        self._manifest = {}
+        self._refreshed_at = 0.0
+        self._last_error = None
+        self._stop = Event()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self._directory, name)
+
+    @contextmanager
+    def _file_lock(self):
+        with open(self._path(".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def load(self) -> bool:
+        """Load the snapshot on disk, if any; returns whether one was found."""
+        with self._file_lock():
+            return self._load()
+
+    def _load(self) -> bool:
+        try:
+            with open(self._path("manifest.json"), encoding="utf-8") as manifest_file:
+                manifest = json.load(manifest_file)
+        except FileNotFoundError:
+            return False
+        if manifest == self._manifest:
+            return True
+        matrix = np.load(self._path("embeddings.npy"), mmap_mode="r")
+        with open(self._path("documents.json"), encoding="utf-8") as documents_file:
+            documents = [Document(page_content=entry["text"], metadata=entry["metadata"], id=entry["id"])
+                         for entry in json.load(documents_file)]
+        with self._lock:
+            self._matrix, self._documents, self._manifest = matrix, documents, manifest
+        return True
+
+    def _replace(self, name: str, write, binary: bool = False):
+        temporary_path = self._path(f"{name}.tmp")
+        with open(temporary_path, "wb") if binary else open(temporary_path, "w", encoding="utf-8") as target:
+            write(target)
+        os.replace(temporary_path, self._path(name))
+
+    def _write(self, matrix: np.ndarray, documents: list[dict], manifest: dict):
+        # Each file is replaced atomically and the manifest goes last, so readers never see a torn snapshot.
+        self._replace("embeddings.npy", lambda target: np.save(target, matrix), binary=True)
+        self._replace("documents.json", lambda target: json.dump(documents, target, ensure_ascii=False, default=str))
+        self._replace("manifest.json", lambda target: json.dump(manifest, target))
+
+    @classmethod
+    def write_snapshot(cls, directory: str, documents: list[Document], embedder: Embeddings) -> "LocalVectorIndex":
+        """Build a snapshot from in-memory documents, e.g. a stand-in corpus for tests that run without Atlas."""
+        index = cls(directory, embedder)
+        embeddings = embedder.embed_documents([document.page_content for document in documents])
+        entries = [{"id": document.id or str(position), "text": document.page_content,
+                    "metadata": document.metadata} for position, document in enumerate(documents)]
+        with index._file_lock():
+            index._write(normalize_rows(np.asarray(embeddings, dtype=np.float32)), entries,
+                         {"count": len(entries), "last_id": None, "built_at": time.time()})
+            index._load()
+        index._refreshed_at = time.time()
+        return index
+
+    def refresh(self):
+        """Append the documents inserted since the last snapshot, or rebuild it when documents were removed."""
+        with self._file_lock():
+            self._load()
+            last_id = json_util.loads(self._manifest["last_id"]) if self._manifest.get("last_id") else None
+            known = self._manifest.get("count", 0)
+            query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+            new_rows = list(self._collection.find(query).sort("_id", 1))
+            if self._collection.count_documents({}) != known + len(new_rows):
+                known, new_rows = 0, list(self._collection.find({}).sort("_id", 1))
+
+            if known and not new_rows:
+                self._refreshed_at = time.time()
+                return
+            entries = [{"id": str(row["_id"]), "text": row.get(TEXT_KEY, ""),
+                        "metadata": {key: value for key, value in row.items()
+                                     if key not in ("_id", TEXT_KEY, EMBEDDING_KEY)}}
+                       for row in new_rows]
+            embeddings = normalize_rows(np.asarray([row[EMBEDDING_KEY] for row in new_rows], dtype=np.float32))
+            if known:
+                with open(self._path("documents.json"), encoding="utf-8") as documents_file:
+                    entries = json.load(documents_file) + entries
+                embeddings = np.concatenate([np.asarray(self._matrix), embeddings])
+            manifest = {
+                "count": len(entries),
+                "last_id": json_util.dumps(new_rows[-1]["_id"]) if new_rows else None,
+                "built_at": time.time(),
+            }
+            self._write(embeddings, entries, manifest)
+            self._load()
+        self._refreshed_at = time.time()
+
+    def start_refresher(self, interval: float):
+        def refresh_periodically():
+            while not self._stop.wait(interval):
+                try:
+                    self.refresh()
+                    self._last_error = None
+                except Exception as error:
+                    # Keep serving the previous snapshot; once it goes stale, queries fall back to Atlas.
+                    self._last_error = str(error)
+
+        Thread(target=refresh_periodically, name="local-vector-index-refresh", daemon=True).start()
+
+    def is_fresh(self, max_staleness: float) -> bool:
+        return len(self._documents) > 0 and time.time() - self._refreshed_at <= max_staleness
+
+    def similarity_search_with_score(self, query: str, k: int = 4) -> list[tuple[Document, float]]:
+        with self._lock:
+            matrix, documents = self._matrix, self._documents
+        if not documents:
+            return []
+        query_vector = normalize_rows(np.asarray([self._embedder.embed_query(query)], dtype=np.float32))[0]
+        similarities = matrix @ query_vector
+        k = min(k, len(documents))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top], kind="stable")]
+        scores = cosine_relevance(similarities[top])
+        return [(documents[index], float(score)) for index, score in zip(top, scores)]
+
+    def similarity_search(self, query: str, k: int = 4) -> list[Document]:
+        return [document for document, _ in self.similarity_search_with_score(query, k)]
+
+    def stats(self) -> dict:
+        return {
+            "documents": len(self._documents),
+            "seconds_since_refresh": time.time() - self._refreshed_at if self._refreshed_at else None,
+            "last_error": self._last_error,
+        }
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    if matrix.size == 0:
+        return matrix
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
@@ -0,0 +1,95 @@
+import os
+import re
+import tempfile
+import time
+from threading import Lock
+
+from common.cache import TTLCache
+
+STATEMENT_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+class StatementNotFoundError(LookupError):
+    pass
+
+
+def secure_delete(path: str):
+    """Overwrite a file with random bytes before unlinking it so extracted statements do not linger on disk."""
+    try:
+        size = os.path.getsize(path)
+        with open(path, "r+b") as statement_file:
+            statement_file.write(os.urandom(size))
+            statement_file.flush()
+            os.fsync(statement_file.fileno())
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class StatementStore:
+    _memory = None
+    _directory = None
+    _ttl = 0
+    _purge_lock = Lock()
+    _last_purge = 0.0
+
+    @classmethod
+    def init_app(cls):
+        if cls._memory is not None:
+            return
+        cls._memory = TTLCache(int(os.getenv("STATEMENT_CACHE_MAX_ENTRIES", "128")))
+        cls._ttl = float(os.getenv("STATEMENT_CACHE_TTL", "3600"))
+        cls._directory = os.getenv("STATEMENT_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "statements")
+        os.makedirs(cls._directory, mode=0o700, exist_ok=True)
+
+    @classmethod
+    def _path(cls, statement_id: str) -> str:
+        if not STATEMENT_ID_PATTERN.match(statement_id):
+            raise StatementNotFoundError(f"Invalid statement_id '{statement_id}'")
+        return os.path.join(cls._directory, f"{statement_id}.md")
+
+    @classmethod
+    def get(cls, statement_id: str) -> str | None:
+        if cls._memory is None:
+            raise RuntimeError("Statement store not initialized. Call init_app first.")
+        bank_statement = cls._memory.get(statement_id)
+        if bank_statement is not None:
+            return bank_statement
+
+        path = cls._path(statement_id)
+        try:
+            age = time.time() - os.path.getmtime(path)
+            if age > cls._ttl:
+                secure_delete(path)
+                return None
+            with open(path, encoding="utf-8") as statement_file:
+                bank_statement = statement_file.read()
+        except FileNotFoundError:
+            return None
+        cls._memory.set(statement_id, bank_statement, cls._ttl - age)
+        return bank_statement
+
+    @classmethod
+    def put(cls, statement_id: str, bank_statement: str):
+        if cls._memory is None:
+            raise RuntimeError("Statement store not initialized. Call init_app first.")
+        cls._memory.set(statement_id, bank_statement, cls._ttl)
+        path = cls._path(statement_id)
+        file_descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(file_descriptor, "w", encoding="utf-8") as statement_file:
+            statement_file.write(bank_statement)
+        cls._purge_expired()
+
+    @classmethod
+    def _purge_expired(cls):
+        now = time.time()
+        with cls._purge_lock:
+            if now - cls._last_purge < 60:
+                return
+            cls._last_purge = now
+        for entry in os.scandir(cls._directory):
+            try:
+                if now - entry.stat().st_mtime > cls._ttl:
+                    secure_delete(entry.path)
+            except FileNotFoundError:
+                continue
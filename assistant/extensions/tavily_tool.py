@@ -1,18 +1,42 @@
 import os
+import tempfile
 
 from tavily import TavilyClient
 
+from .cache import PersistentTTLCache, normalize_query
+
 
 class Tavily:
     _client = None
+    _cache = None
+    _ttl = 0
 
     @classmethod
     def init_app(cls):
         if cls._client is None:
             cls._client = TavilyClient(api_key=os.environ["TAVILY_API_KEY"])
+            cls._ttl = float(os.getenv("TAVILY_CACHE_TTL", "21600"))
+            path = None
+            if os.getenv("TAVILY_CACHE_PERSIST", "true").lower() == "true":
+                path = os.getenv("TAVILY_CACHE_PATH") or os.path.join(tempfile.gettempdir(), "tavily_cache.sqlite3")
+            cls._cache = PersistentTTLCache(int(os.getenv("TAVILY_CACHE_MAX_ENTRIES", "1000")), path, "searches")
 
     @classmethod
     def get_tavily_client(cls):
         if cls._client is None:
             raise RuntimeError("Database not initialized. Call init_app first.")
         return cls._client
+
+    @classmethod
+    def search(cls, query: str) -> dict:
+        """Tavily search, cached by normalized query for TAVILY_CACHE_TTL seconds."""
+        key = normalize_query(query)
+        response = cls._cache.get(key) if cls._cache is not None else None
+        if response is None:
+            response = cls.get_tavily_client().search(query)
+            cls._cache.set(key, response, cls._ttl)
+        return response
+
+    @classmethod
+    def stats(cls) -> dict:
+        return cls._cache.stats() if cls._cache is not None else {}
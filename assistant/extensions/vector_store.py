@@ -1,35 +1,84 @@
 import os
+import tempfile
 
 from langchain_mongodb import MongoDBAtlasVectorSearch
 from langchain_openai import OpenAIEmbeddings
 from pymongo import MongoClient
 
+from .embedding_cache import build_cached_embedder
+from .local_vector_index import LocalVectorIndex
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+DB_NAME = "bp_ai"
+COLLECTION_NAME = "financial_education"
+VECTOR_SEARCH_INDEX_NAME = "langchain-test-index-vectorstores"
+
+VECTOR_STORE_MODES = ("atlas", "local", "offline")
+
 
 class VectorStore:
+    """Atlas vector search, optionally fronted by an in-process replica of the collection.
+
+    VECTOR_STORE_MODE selects `atlas` (default), `local` (replica refreshed from Mongo, Atlas while it is stale) or
+    `offline` (replica snapshot only, no Mongo connection, e.g. for tests against a stand-in corpus).
+    """
     _client = None
     _embedder = None
     _vector_store = None
+    _local_index = None
+    _mode = None
+    _max_staleness = 0.0
 
     @classmethod
     def init_app(cls):
-        if cls._vector_store is None:
-            cls._client = MongoClient(os.environ['MONGODB_URI'])
-            cls._embedder = OpenAIEmbeddings(model="text-embedding-3-small")
-            db_name = "bp_ai"
-            collection_name = "financial_education"
-            atlas_vector_search_index_name = "langchain-test-index-vectorstores"
+        if cls._vector_store is None and cls._local_index is None:
+            cls._mode = os.getenv("VECTOR_STORE_MODE", "atlas")
+            if cls._mode not in VECTOR_STORE_MODES:
+                raise ValueError(f"Unknown vector store mode '{cls._mode}', expected one of {VECTOR_STORE_MODES}")
+            cls._embedder = build_cached_embedder(OpenAIEmbeddings(model=EMBEDDING_MODEL), EMBEDDING_MODEL)
+            snapshot_directory = (os.getenv("LOCAL_VECTOR_INDEX_DIR")
+                                  or os.path.join(tempfile.gettempdir(), "financial_education_index"))
+            if cls._mode == "offline":
+                cls._local_index = LocalVectorIndex(snapshot_directory, cls._embedder)
+                if not cls._local_index.load():
+                    raise RuntimeError(f"No vector index snapshot found in {snapshot_directory}")
+                return
 
-            mongodb_collection = cls._client[db_name][collection_name]
+            cls._client = MongoClient(os.environ['MONGODB_URI'])
+            mongodb_collection = cls._client[DB_NAME][COLLECTION_NAME]
 
             cls._vector_store = MongoDBAtlasVectorSearch(
                 collection=mongodb_collection,
                 embedding=cls._embedder,
-                index_name=atlas_vector_search_index_name,
+                index_name=VECTOR_SEARCH_INDEX_NAME,
                 relevance_score_fn="cosine",
             )
 
+            if cls._mode == "local":
+                refresh_interval = float(os.getenv("LOCAL_VECTOR_INDEX_REFRESH_INTERVAL", "300"))
+                cls._max_staleness = float(os.getenv("LOCAL_VECTOR_INDEX_MAX_STALENESS", str(3 * refresh_interval)))
+                cls._local_index = LocalVectorIndex(snapshot_directory, cls._embedder, mongodb_collection)
+                try:
+                    cls._local_index.refresh()
+                except Exception:
+                    # Serve from Atlas until the background refresh manages to build a snapshot.
+                    pass
+                cls._local_index.start_refresher(refresh_interval)
+
     @classmethod
     def get_vector_store(cls):
+        if cls._local_index is not None and (cls._mode == "offline" or cls._local_index.is_fresh(cls._max_staleness)):
+            return cls._local_index
         if cls._vector_store is None:
             raise RuntimeError("Database not initialized. Call init_app first.")
         return cls._vector_store
+
+    @classmethod
+    def stats(cls) -> dict:
+        if cls._embedder is None:
+            return {}
+        return {
+            "mode": cls._mode,
+            "embedding_cache": cls._embedder.stats(),
+            "local_index": cls._local_index.stats() if cls._local_index is not None else None,
+        }
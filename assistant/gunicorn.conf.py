@@ -0,0 +1,26 @@
+import math
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+# One worker per core: requests mostly wait on OpenAI, Tavily or Mongo, so threads carry the concurrency, and every
+# extra worker duplicates its graphs, clients and executors. The threads are sized so the instance holds
+# GUNICORN_MAX_IN_FLIGHT requests at once whatever its core count.
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+threads = int(os.getenv("GUNICORN_THREADS") or math.ceil(int(os.getenv("GUNICORN_MAX_IN_FLIGHT", "256")) / workers))
+# Read back by the workers to split the cores between their PDF extraction pools.
+os.environ["WEB_CONCURRENCY"] = str(workers)
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "300"))
+graceful_timeout = 30
+keepalive = 5
+# The directory holding the `assistant` package and the shared `common` one: the repository root in a checkout, /app in
+# the image. Workers start there so the `assistant` directory is imported as the package, not its `assistant.py` app.
+chdir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+pythonpath = chdir
+
+# Each worker imports the app itself so graphs, LLM and database clients are built once per worker
+# after the fork instead of being shared across processes.
+preload_app = False
+
+worker_class = "gthread"
+wsgi_app = "assistant.assistant:app"
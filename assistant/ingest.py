@@ -0,0 +1,226 @@
+"""Ingest PDFs and markdown files into the financial education vector collection.
+
+Usage: python -m assistant.ingest assistant/knowledge_base/ [more paths...] [--prune] [--dry-run]
+
+Only files whose content changed since the last run are re-chunked, and only chunks whose text is new are embedded.
+"""
+import argparse
+import hashlib
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import pypdfium2
+from langchain_core.documents import Document
+from langchain_openai import OpenAIEmbeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from openai import RateLimitError
+from pymongo import ASCENDING, MongoClient, UpdateOne
+
+from .extensions.vector_store import COLLECTION_NAME, DB_NAME, EMBEDDING_MODEL
+
+MANIFEST_COLLECTION_NAME = "financial_education_ingestion"
+SUPPORTED_EXTENSIONS = (".pdf", ".md", ".markdown")
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as source_file:
+        for chunk in iter(lambda: source_file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+def discover(paths: list[str]) -> dict[str, tuple[str, str]]:
+    """Map each source key, the file's path relative to the directory it was found under, to the file's path and the
+    absolute path of that directory, its ingestion root.
+
+    A file given directly is keyed by its name. Two files that would get the same key are rejected, since each run
+    replaces the chunks stored under a key with those of the file it maps to.
+    """
+    files = {}
+    for path in paths:
+        if os.path.isdir(path):
+            found = [os.path.join(root, name) for root, _, names in os.walk(path) for name in sorted(names)
+                     if name.lower().endswith(SUPPORTED_EXTENSIONS)]
+            root_path = path
+        elif path.lower().endswith(SUPPORTED_EXTENSIONS):
+            found, root_path = [path], os.path.dirname(path)
+        else:
+            continue
+        for file_path in found:
+            source = os.path.relpath(file_path, root_path).replace(os.sep, "/")
+            if source in files and os.path.abspath(files[source][0]) != os.path.abspath(file_path):
+                raise SystemExit(f"{files[source][0]} and {file_path} would both be ingested as '{source}'")
+            files[source] = (file_path, os.path.abspath(root_path))
+    return files
+
+
+def load_pdf(path: str, source: str) -> list[Document]:
+    pdf = pypdfium2.PdfDocument(path)
+    try:
+        pages = []
+        for index in range(len(pdf)):
+            page = pdf[index]
+            text_page = page.get_textpage()
+            try:
+                text = text_page.get_text_bounded().replace("\r\n", "\n")
+            finally:
+                text_page.close()
+                page.close()
+            if text.strip():
+                pages.append(Document(page_content=text, metadata={"source": source, "page": index + 1}))
+        return pages
+    finally:
+        pdf.close()
+
+
+def load_markdown(path: str, source: str) -> list[Document]:
+    with open(path, encoding="utf-8") as markdown_file:
+        return [Document(page_content=markdown_file.read(), metadata={"source": source, "page": 1})]
+
+
+def load(path: str, source: str) -> list[Document]:
+    if path.lower().endswith(".pdf"):
+        return load_pdf(path, source)
+    return load_markdown(path, source)
+
+
+def chunk(documents: list[Document], splitter: RecursiveCharacterTextSplitter) -> list[Document]:
+    """Split pages into chunks, keeping the first occurrence of every distinct chunk text."""
+    chunks, seen = [], set()
+    for document in splitter.split_documents(documents):
+        digest = content_hash(document.page_content)
+        if digest in seen:
+            continue
+        seen.add(digest)
+        document.metadata["content_hash"] = digest
+        chunks.append(document)
+    return chunks
+
+
+def embed_with_backoff(embedder: OpenAIEmbeddings, texts: list[str], max_retries: int) -> list[list[float]]:
+    for attempt in range(max_retries + 1):
+        try:
+            return embedder.embed_documents(texts)
+        except RateLimitError:
+            if attempt == max_retries:
+                raise
+            time.sleep(min(60.0, 2 ** attempt) + random.uniform(0, 1))
+
+
+def embed(embedder: OpenAIEmbeddings, chunks: list[Document], batch_size: int, concurrency: int,
+          max_retries: int) -> list[list[float]]:
+    batches = [chunks[start:start + batch_size] for start in range(0, len(chunks), batch_size)]
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = executor.map(
+            lambda batch: embed_with_backoff(embedder, [document.page_content for document in batch], max_retries),
+            batches,
+        )
+        return [vector for batch_vectors in results for vector in batch_vectors]
+
+
+def uncovered_roots(stale_rows: list[dict], files: dict[str, tuple[str, str]]) -> list[str]:
+    """Roots of the stale manifest rows that this run did not walk, where pruning would delete live sources.
+
+    Rows without a root predate their recording. They are only prunable when keyed by the name of a file found in this
+    run, which is how sources were keyed before they were keyed by their path under the root.
+    """
+    roots = {root for _, root in files.values()}
+    names = {os.path.basename(source) for source in files}
+    return sorted({row.get("root") or "an unknown directory" for row in stale_rows
+                   if row.get("root") not in roots and (row.get("root") or row["_id"] not in names)})
+
+
+def ingest_file(path: str, source: str, root: str, collection, manifest, embedder: OpenAIEmbeddings,
+                splitter: RecursiveCharacterTextSplitter, args) -> dict:
+    digest = file_hash(path)
+    previous = manifest.find_one({"_id": source})
+    if previous is not None and previous["file_hash"] == digest:
+        if previous.get("root") != root and not args.dry_run:
+            manifest.update_one({"_id": source}, {"$set": {"root": root}})
+        return {"source": source, "status": "unchanged"}
+
+    chunks = chunk(load(path, source), splitter)
+    hashes = [document.metadata["content_hash"] for document in chunks]
+    stored = {row["content_hash"] for row in collection.find({"source": source, "content_hash": {"$in": hashes}},
+                                                             {"content_hash": 1})}
+    new_chunks = [document for document in chunks if document.metadata["content_hash"] not in stored]
+    if args.dry_run:
+        return {"source": source, "status": "changed", "chunks": len(chunks), "new": len(new_chunks)}
+
+    vectors = embed(embedder, new_chunks, args.batch_size, args.concurrency, args.max_retries)
+    operations = [
+        UpdateOne(
+            {"source": source, "content_hash": document.metadata["content_hash"]},
+            {"$set": {"text": document.page_content, "embedding": vector, **document.metadata}},
+            upsert=True,
+        )
+        for document, vector in zip(new_chunks, vectors)
+    ]
+    for start in range(0, len(operations), args.write_batch_size):
+        collection.bulk_write(operations[start:start + args.write_batch_size], ordered=False)
+    removed = collection.delete_many({"source": source, "content_hash": {"$nin": hashes}}).deleted_count
+    manifest.replace_one({"_id": source}, {"_id": source, "root": root, "file_hash": digest, "chunks": len(chunks),
+                                           "ingested_at": datetime.now(timezone.utc)}, upsert=True)
+    return {"source": source, "status": "ingested", "chunks": len(chunks), "new": len(new_chunks), "removed": removed}
+
+
+def prune(collection, manifest, files: dict[str, tuple[str, str]], dry_run: bool) -> str:
+    rows = list(manifest.find({"_id": {"$nin": list(files)}}, {"_id": 1, "root": 1}))
+    uncovered = uncovered_roots(rows, files)
+    if uncovered:
+        raise SystemExit(f"Refusing to prune: sources were ingested from {', '.join(uncovered)}, which the given paths "
+                         "do not include")
+    stale = [row["_id"] for row in rows]
+    if not stale:
+        return "nothing to prune"
+    if dry_run:
+        return f"would prune {len(stale)} sources: {', '.join(stale)}"
+    collection.delete_many({"source": {"$in": stale}})
+    manifest.delete_many({"_id": {"$in": stale}})
+    return f"pruned {len(stale)} sources: {', '.join(stale)}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=150)
+    parser.add_argument("--batch-size", type=int, default=256, help="texts per embedding request")
+    parser.add_argument("--concurrency", type=int, default=4, help="embedding requests in flight")
+    parser.add_argument("--max-retries", type=int, default=6, help="retries per batch after a rate limit error")
+    parser.add_argument("--write-batch-size", type=int, default=500)
+    parser.add_argument("--prune", action="store_true",
+                        help="delete sources that are no longer in the given paths; refused unless the paths include "
+                             "every directory the collection was ingested from")
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without writing")
+    args = parser.parse_args()
+
+    client = MongoClient(os.environ["MONGODB_URI"])
+    collection = client[DB_NAME][COLLECTION_NAME]
+    manifest = client[DB_NAME][MANIFEST_COLLECTION_NAME]
+    if not args.dry_run:
+        # Partial, so chunks loaded by hand before this tool existed (without content_hash) do not collide.
+        collection.create_index([("source", ASCENDING), ("content_hash", ASCENDING)], unique=True,
+                                partialFilterExpression={"content_hash": {"$exists": True}})
+    embedder = OpenAIEmbeddings(model=EMBEDDING_MODEL)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
+
+    files = discover(args.paths)
+    for source, (path, root) in files.items():
+        result = ingest_file(path, source, root, collection, manifest, embedder, splitter, args)
+        print(", ".join(f"{key}={value}" for key, value in result.items()))
+
+    if args.prune:
+        print(prune(collection, manifest, files, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,106 @@
-from io import BytesIO
-
 from flask import request
 from flask.views import MethodView
-from flask_smorest import Blueprint
+from flask_smorest import Blueprint, abort
 
-from schemas import AssistantSchema
-from services.analyze_pdf_service import build_pdf_analyzer_graph
+from ....extensions.job_queue import JobQueue, JobQueueFullError
+from ....extensions.statement_store import StatementNotFoundError
+from ....schemas import JobSchema, StatementSchema
+from ....services.analyze_pdf_service import build_pdf_analyzer_graph, run_analysis_job
+from ....services.pdf_extraction import PdfTooLargeError, spool_pdf
+from ....services.streaming_service import sse_response, stream_answer_events
 
 blp = Blueprint("analyze_pdf", __name__, description="Bank Statement analysis")
 
 graph = build_pdf_analyzer_graph()
 
 
+def open_pdf_upload(pdf_file):
+    if pdf_file is None:
+        return None
+    try:
+        return spool_pdf(pdf_file.stream)
+    except PdfTooLargeError as error:
+        abort(413, message=str(error))
+
+
+def close_after(events, pdf_stream):
+    try:
+        yield from events
+    finally:
+        if pdf_stream is not None:
+            pdf_stream.close()
+
+
 @blp.route("/analyze-pdf")
 class ChatRag(MethodView):
 
-    @blp.arguments(AssistantSchema, location="form")
-    @blp.response(200, AssistantSchema)
+    @blp.arguments(StatementSchema, location="form")
+    @blp.response(200, StatementSchema)
+    def post(self, request_data):
+        pdf_file = request.files.get("pdf_file")
+        if pdf_file is None and not request_data.get("statement_id"):
+            return {"message": "Missing pdf_file or statement_id in request"}, 400
+
+        pdf_stream = open_pdf_upload(pdf_file)
+        try:
+            response = graph.invoke({"pdf_stream": pdf_stream, "statement_id": request_data.get("statement_id"),
+                                     "question": request_data["question"]})
+        except PdfTooLargeError as error:
+            abort(413, message=str(error))
+        except StatementNotFoundError as error:
+            abort(404, message=str(error))
+        finally:
+            if pdf_stream is not None:
+                pdf_stream.close()
+
+        return {"response": response["answer"], "question": request_data["question"],
+                "statement_id": response["statement_id"]}
+
+
+@blp.route("/analyze-pdf/stream")
+class AnalyzePdfStream(MethodView):
+
+    @blp.arguments(StatementSchema, location="form")
+    def post(self, request_data):
+        pdf_file = request.files.get("pdf_file")
+        if pdf_file is None and not request_data.get("statement_id"):
+            return {"message": "Missing pdf_file or statement_id in request"}, 400
+
+        pdf_stream = open_pdf_upload(pdf_file)
+
+        inputs = {"pdf_stream": pdf_stream, "statement_id": request_data.get("statement_id"),
+                  "question": request_data["question"]}
+        events = stream_answer_events(graph, inputs, "analyze_bank_statement")
+        return sse_response(close_after(events, pdf_stream))
+
+
+@blp.route("/analyze-pdf/jobs")
+class AnalyzePdfJobs(MethodView):
+
+    @blp.arguments(StatementSchema, location="form")
+    @blp.response(202, JobSchema)
     def post(self, request_data):
         pdf_file = request.files.get("pdf_file")
-        if pdf_file is None:
-            return {"message": "Missing pdf_file in request"}, 400
+        if pdf_file is None and not request_data.get("statement_id"):
+            return {"message": "Missing pdf_file or statement_id in request"}, 400
+
+        pdf_stream = open_pdf_upload(pdf_file)
+        try:
+            job_id = JobQueue.submit(run_analysis_job, graph, pdf_stream, request_data.get("statement_id"),
+                                     request_data["question"])
+        except JobQueueFullError as error:
+            if pdf_stream is not None:
+                pdf_stream.close()
+            abort(429, message=str(error), headers={"Retry-After": "30"})
+        return {"job_id": job_id, "status": "queued"}
 
-        pdf_stream = BytesIO(pdf_file.read())
 
-        response = graph.invoke({"pdf_stream": pdf_stream, "question": request_data["question"]})
+@blp.route("/analyze-pdf/jobs/<string:job_id>")
+class AnalyzePdfJob(MethodView):
 
-        return {"response": response["answer"], "question": request_data["question"]}
+    @blp.response(200, JobSchema)
+    def get(self, job_id):
+        job = JobQueue.get(job_id)
+        if job is None:
+            abort(404, message=f"Job '{job_id}' is unknown or has expired")
+        return job
@@ -1,8 +1,11 @@
+import os
+
 from flask.views import MethodView
 from flask_smorest import Blueprint
 
-from schemas import AssistantSchema
-from services.chat_rag_service import build_chat_rag_graph
+from ....schemas import AssistantSchema, BatchSchema
+from ....services.chat_rag_service import build_chat_rag_graph
+from ....services.streaming_service import sse_response, stream_answer_events
 
 blp = Blueprint("chat_rag", __name__, description="Chat with RAG")
 
@@ -17,3 +20,35 @@ class ChatRag(MethodView):
     def post(self, request_data):
         response = graph.invoke({"question": request_data["question"]})
         return {"response": response["answer"], "question": request_data["question"]}
+
+
+@blp.route("/rag/stream")
+class ChatRagStream(MethodView):
+
+    @blp.arguments(AssistantSchema)
+    def post(self, request_data):
+        events = stream_answer_events(graph, {"question": request_data["question"]}, "generate")
+        return sse_response(events)
+
+
+@blp.route("/rag/batch")
+class ChatRagBatch(MethodView):
+
+    @blp.arguments(BatchSchema)
+    @blp.response(200, BatchSchema)
+    def post(self, request_data):
+        questions = request_data["questions"]
+        # Callers may ask for less concurrency than this service allows, never more.
+        max_concurrency = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+        max_concurrency = min(request_data.get("max_concurrency", max_concurrency), max_concurrency)
+        responses = graph.batch(
+            [{"question": question} for question in questions],
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True,
+        )
+        results = [
+            {"question": question, "error": str(response)} if isinstance(response, Exception)
+            else {"question": question, "response": response["answer"]}
+            for question, response in zip(questions, responses)
+        ]
+        return {"results": results}
@@ -1,8 +1,9 @@
 from flask.views import MethodView
 from flask_smorest import Blueprint
 
-from schemas import AssistantSchema
-from services.shopping_advisor_service import build_shopping_advisor_graph
+from ....schemas import AssistantSchema
+from ....services.shopping_advisor_service import build_shopping_advisor_graph
+from ....services.streaming_service import sse_response, stream_answer_events
 
 blp = Blueprint("shopping-advisor", __name__, description="Shopping advisor")
 
@@ -17,3 +18,12 @@ class ChatRag(MethodView):
     def post(self, request_data):
         response = graph.invoke({"question": request_data["question"]})
         return {"response": response["answer"], "question": request_data["question"]}
+
+
+@blp.route("/shopping-advisor/stream")
+class ShoppingAdvisorStream(MethodView):
+
+    @blp.arguments(AssistantSchema)
+    def post(self, request_data):
+        events = stream_answer_events(graph, {"question": request_data["question"]}, "analyze_results")
+        return sse_response(events)
@@ -0,0 +1,21 @@
+from flask.views import MethodView
+from flask_smorest import Blueprint
+
+from ....extensions.job_queue import JobQueue
+from ....extensions.llm import LLM
+from ....extensions.tavily_tool import Tavily
+from ....extensions.vector_store import VectorStore
+
+blp = Blueprint("stats", __name__, description="Assistant runtime statistics")
+
+
+@blp.route("/stats")
+class AssistantStats(MethodView):
+
+    def get(self):
+        return {
+            "vector_store": VectorStore.stats(),
+            "search_cache": Tavily.stats(),
+            "analysis_jobs": JobQueue.stats(),
+            "openai_rate_limiter": LLM.stats(),
+        }
@@ -1,6 +1,29 @@
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, validate
 
 
 class AssistantSchema(Schema):
     question = fields.Str(required=True)
     response = fields.Str(dump_only=True)
+
+
+class StatementSchema(AssistantSchema):
+    statement_id = fields.Str()
+
+
+class JobSchema(Schema):
+    job_id = fields.Str(dump_only=True)
+    status = fields.Str(dump_only=True)
+    result = fields.Nested(StatementSchema, dump_only=True)
+    error = fields.Str(dump_only=True)
+
+
+class BatchItemSchema(Schema):
+    question = fields.Str()
+    response = fields.Str()
+    error = fields.Str()
+
+
+class BatchSchema(Schema):
+    questions = fields.List(fields.Str(), required=True, load_only=True, validate=validate.Length(min=1, max=1000))
+    max_concurrency = fields.Int(load_only=True, validate=validate.Range(min=1))
+    results = fields.List(fields.Nested(BatchItemSchema), dump_only=True)
@@ -1,64 +1,137 @@
+import os
+import re
 from io import BytesIO
 from typing import TypedDict
 
-import pdfplumber
 from langchain_core.prompts import ChatPromptTemplate
 from langgraph.constants import START
 from langgraph.graph import StateGraph
 from langgraph.graph.state import CompiledStateGraph
 
-from extensions.llm import LLM
+from ..extensions.llm import LLM
+from ..extensions.statement_store import StatementNotFoundError, StatementStore
+from .pdf_extraction import extract_markdown, pdf_content_hash
+from .transactions import parse_transactions, summarize_transactions
+
+SUMMARY_NOTE = """
+The bank statement you receive was pre-processed: its expenses were parsed from the statement tables, and the top
+expenses, the totals grouped by establishment and the rows related to the question are exact. Use these figures as
+they are instead of recomputing them.
+"""
+
+PARTIALS_NOTE = """
+The bank statement was too long to read at once, so you receive the expenses extracted from each group of pages
+instead. Merge these partial lists, without counting any expense twice, before following the steps.
+"""
+
+MAP_PROMPT = """
+You receive some consecutive pages of a bank statement. List every expense they contain, one per line, as
+"date | establishment | amount", keeping the amounts exactly as written. After the list, add one short line with any
+information on these pages that helps answer the question. Do not answer the question and do not add other text.
+"""
+
+PAGE_PATTERN = re.compile(r"^(?=## Page \d+)", re.MULTILINE)
 
 
 class State(TypedDict):
     pdf_stream: BytesIO
+    statement_id: str
     bank_statement: str
+    transactions_summary: str
+    partial_analyses: list[str]
     question: str
     answer: str
 
 
-def table_to_markdown(table):
-    if not table:
-        return ""
+def load_statement(state: State):
+    if state.get("pdf_stream") is not None:
+        state["statement_id"] = pdf_content_hash(state["pdf_stream"])
+    elif not state.get("statement_id"):
+        raise StatementNotFoundError("Either pdf_stream or statement_id is required")
 
-    header, *rows = table
-
-    header = [cell if cell is not None else "" for cell in header]
-    rows = [[cell if cell is not None else "" for cell in row] for row in rows]
+    bank_statement = StatementStore.get(state["statement_id"])
+    if bank_statement is None and state.get("pdf_stream") is None:
+        raise StatementNotFoundError(f"Statement '{state['statement_id']}' is unknown or has expired")
+    state["bank_statement"] = bank_statement
+    return state
 
-    md_lines = ["| " + " | ".join(header) + " |", "| " + " | ".join(["---"] * len(header)) + " |"]
-    for row in rows:
-        md_lines.append("| " + " | ".join(row) + " |")
 
-    return "\n".join(md_lines)
+def route_statement(state: State):
+    if state["bank_statement"] is None:
+        return "pdf_to_text_with_tables"
+    return "summarize_statement"
 
 
 def pdf_to_text_with_tables(state: State):
-    output_lines = []
-    with pdfplumber.open(state["pdf_stream"]) as pdf:
-        for page_number, page in enumerate(pdf.pages, start=1):
-            output_lines.append(f"## Page {page_number}\n")
-
-            page_text = page.extract_text()
-            if page_text:
-                output_lines.append(page_text)
-                output_lines.append("\n")
-
-            tables = page.extract_tables()
-            if tables:
-                output_lines.append("### Detected Table(s):\n")
-                for i, table in enumerate(tables, start=1):
-                    output_lines.append(f"**Table {i}:**")
-                    md_table = table_to_markdown(table)
-                    output_lines.append(md_table)
-                    output_lines.append("\n")
-
-    state["bank_statement"] = "\n".join(output_lines)
+    state["bank_statement"] = extract_markdown(state["pdf_stream"])
+    StatementStore.put(state["statement_id"], state["bank_statement"])
+    return state
+
+
+def summarize_statement(state: State):
+    """Compute the rankings and per-establishment totals up front, so the LLM gets exact figures and fewer tokens."""
+    transactions = parse_transactions(state["bank_statement"])
+    if len(transactions) < int(os.getenv("STATEMENT_SUMMARY_MIN_TRANSACTIONS", "3")):
+        state["transactions_summary"] = None
+        return state
+    state["transactions_summary"] = summarize_transactions(transactions, state["question"])
+    return state
+
+
+def route_analysis(state: State):
+    if state.get("transactions_summary"):
+        return "analyze_bank_statement"
+    threshold = int(os.getenv("PDF_MAP_REDUCE_TOKEN_THRESHOLD", "12000"))
+    if LLM.get_llm().get_num_tokens(state["bank_statement"]) <= threshold:
+        return "analyze_bank_statement"
+    return "map_statement_chunks"
+
+
+def chunk_pages(llm, bank_statement: str, max_tokens: int) -> list[str]:
+    """Group consecutive pages into chunks of at most `max_tokens`; a single larger page becomes its own chunk."""
+    chunks, current, current_tokens = [], [], 0
+    for page in PAGE_PATTERN.split(bank_statement):
+        if not page.strip():
+            continue
+        page_tokens = llm.get_num_tokens(page)
+        if current and current_tokens + page_tokens > max_tokens:
+            chunks.append("".join(current))
+            current, current_tokens = [], 0
+        current.append(page)
+        current_tokens += page_tokens
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def map_statement_chunks(state: State):
+    """Extract the expenses of each page chunk concurrently; `analyze_bank_statement` then reduces them."""
+    llm = LLM.get_llm("chunk_extractor")
+    chunks = chunk_pages(llm, state["bank_statement"], int(os.getenv("PDF_MAP_CHUNK_TOKENS", "6000")))
+    prompt_template = ChatPromptTemplate([
+        ("system", MAP_PROMPT),
+        ("user", "Páginas del extracto bancario: {pages} Pregunta recibida: {question}")
+    ])
+    responses = llm.batch(
+        [prompt_template.invoke({"pages": chunk, "question": state["question"]}) for chunk in chunks],
+        config={"max_concurrency": int(os.getenv("PDF_MAP_MAX_CONCURRENCY", "4"))},
+    )
+    state["partial_analyses"] = [response.content for response in responses]
     return state
 
 
 def analyze_bank_statement(state: State):
-    llm = LLM.get_llm()
+    llm = LLM.get_llm("statement_analyzer")
+    summary = state.get("transactions_summary")
+    partial_analyses = state.get("partial_analyses")
+    if summary:
+        bank_statement, note = summary, SUMMARY_NOTE
+    elif partial_analyses:
+        bank_statement = "\n\n".join(f"### Parte {index}\n{partial}"
+                                      for index, partial in enumerate(partial_analyses, start=1))
+        note = PARTIALS_NOTE
+    else:
+        bank_statement, note = state["bank_statement"], None
     prompt_template = ChatPromptTemplate([
         ("system",
          """
@@ -132,15 +205,38 @@ def analyze_bank_statement(state: State):
 - The answer to the question should be clear, concise, and directly tied to the extracted data.
 - The output must be solely in Spanish and formatted concisely.
          """),
+        *([("system", note)] if note else []),
         ("user", "Entrada del extracto bancario: {bank_statement} Pregunta recibida: {question}")
     ])
-    messages = prompt_template.invoke({"bank_statement": state["bank_statement"], "question": state["question"]})
+    messages = prompt_template.invoke({"bank_statement": bank_statement, "question": state["question"]})
     response = llm.invoke(messages)
     state["answer"] = response.content
     return state
 
 
 def build_pdf_analyzer_graph() -> CompiledStateGraph:
-    graph_builder = StateGraph(State).add_sequence([pdf_to_text_with_tables, analyze_bank_statement])
-    graph_builder.add_edge(START, "pdf_to_text_with_tables")
+    graph_builder = StateGraph(State).add_sequence([pdf_to_text_with_tables, summarize_statement])
+    graph_builder.add_sequence([map_statement_chunks, analyze_bank_statement])
+    graph_builder.add_node(load_statement)
+    graph_builder.add_edge(START, "load_statement")
+    graph_builder.add_conditional_edges(
+        "load_statement",
+        route_statement,
+        {"pdf_to_text_with_tables": "pdf_to_text_with_tables", "summarize_statement": "summarize_statement"}
+    )
+    graph_builder.add_conditional_edges(
+        "summarize_statement",
+        route_analysis,
+        {"map_statement_chunks": "map_statement_chunks", "analyze_bank_statement": "analyze_bank_statement"}
+    )
     return graph_builder.compile()
+
+
+def run_analysis_job(graph: CompiledStateGraph, pdf_stream, statement_id: str | None, question: str) -> dict:
+    """Body of an asynchronous analysis job; it owns `pdf_stream` and closes it when done."""
+    try:
+        response = graph.invoke({"pdf_stream": pdf_stream, "statement_id": statement_id, "question": question})
+    finally:
+        if pdf_stream is not None:
+            pdf_stream.close()
+    return {"response": response["answer"], "question": question, "statement_id": response["statement_id"]}
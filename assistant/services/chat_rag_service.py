@@ -1,3 +1,5 @@
+import os
+import re
 from typing import TypedDict, List
 
 from langchain_core.documents import Document
@@ -5,8 +7,12 @@ from langchain_core.prompts import ChatPromptTemplate
 from langgraph.constants import START
 from langgraph.graph import StateGraph
 
-from extensions.llm import LLM
-from extensions.vector_store import VectorStore
+from ..extensions.llm import LLM
+from ..extensions.vector_store import VectorStore
+
+WORD_PATTERN = re.compile(r"\w+")
+# Approximate chars per token, only used to cut a single chunk that alone exceeds the budget.
+CHARS_PER_TOKEN = 4
 
 
 class State(TypedDict):
@@ -15,14 +21,79 @@ class State(TypedDict):
     answer: str
 
 
+def shingles(text: str, size: int = 3) -> set:
+    words = WORD_PATTERN.findall(text.lower())
+    return {tuple(words[index:index + size]) for index in range(max(len(words) - size + 1, 1))}
+
+
+def is_near_duplicate(candidate: set, kept: list[set], threshold: float) -> bool:
+    return any(len(candidate & other) / max(len(candidate | other), 1) >= threshold for other in kept)
+
+
+def join_overlapping(first: str, second: str, max_overlap: int = 500) -> str:
+    """Concatenate two chunks, dropping the text the splitter repeated at the end of one and the start of the next."""
+    for length in range(min(len(first), len(second), max_overlap), 20, -1):
+        if first.endswith(second[:length]):
+            return first + second[length:]
+        if second.endswith(first[:length]):
+            return second + first[length:]
+    return f"{first}\n{second}"
+
+
+def select_chunks(scored_docs: list[tuple[Document, float]]) -> list[Document]:
+    """Keep the chunks close to the best score, drop near-duplicates and merge chunks of the same page."""
+    threshold = float(os.getenv("RAG_SCORE_THRESHOLD", "0.7"))
+    score_gap = float(os.getenv("RAG_SCORE_GAP", "0.05"))
+    min_k = int(os.getenv("RAG_MIN_K", "1"))
+    duplicate_threshold = float(os.getenv("RAG_DUPLICATE_THRESHOLD", "0.8"))
+
+    scored_docs = sorted(scored_docs, key=lambda scored: scored[1], reverse=True)
+    if not scored_docs:
+        return []
+    cutoff = max(threshold, scored_docs[0][1] - score_gap)
+
+    pages, kept_shingles = {}, []
+    for position, (doc, score) in enumerate(scored_docs):
+        if position >= min_k and score < cutoff:
+            break
+        doc_shingles = shingles(doc.page_content)
+        if is_near_duplicate(doc_shingles, kept_shingles, duplicate_threshold):
+            continue
+        kept_shingles.append(doc_shingles)
+        key = (doc.metadata.get("source"), doc.metadata.get("page"))
+        if key in pages:
+            merged = pages[key]
+            pages[key] = Document(page_content=join_overlapping(merged.page_content, doc.page_content),
+                                  metadata=merged.metadata)
+        else:
+            pages[key] = doc
+    return list(pages.values())
+
+
+def trim_to_budget(docs: list[Document], max_tokens: int) -> list[Document]:
+    llm = LLM.get_llm()
+    selected, used = [], 0
+    for doc in docs:
+        tokens = llm.get_num_tokens(doc.page_content)
+        if used + tokens <= max_tokens:
+            selected.append(doc)
+            used += tokens
+        elif not selected:
+            selected.append(Document(page_content=doc.page_content[:max_tokens * CHARS_PER_TOKEN],
+                                     metadata=doc.metadata))
+            break
+    return selected
+
+
 def retrieve(state: State):
     vector_store = VectorStore.get_vector_store()
-    retrieved_docs = vector_store.similarity_search(state["question"], k=3)
-    return {"context": retrieved_docs}
+    scored_docs = vector_store.similarity_search_with_score(state["question"], k=int(os.getenv("RAG_MAX_K", "8")))
+    retrieved_docs = select_chunks(scored_docs)
+    return {"context": trim_to_budget(retrieved_docs, int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "1500")))}
 
 
 def generate(state: State):
-    llm = LLM.get_llm()
+    llm = LLM.get_llm("generator")
     chat_template = ChatPromptTemplate([
         ("system", """
         Actúa como un asistente financiero especializado en educación financiera que responde preguntas basándote en fragmentos recuperados de textos. Evalúa los fragmentos proporcionados para extraer la información relevante a la pregunta planteada. 
@@ -0,0 +1,279 @@
+import hashlib
+import mmap
+import os
+import re
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO, StringIO
+from multiprocessing import get_context
+from threading import Lock
+
+import pdfplumber
+import pypdfium2
+
+# Kept free of LangChain imports: process pool workers import this module on start-up.
+
+_pool = None
+_pool_lock = Lock()
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+DATE_PATTERN = re.compile(r"\b\d{1,2}[/-]\d{1,2}(?:[/-]\d{2,4})?\b|\b\d{4}-\d{2}-\d{2}\b")
+AMOUNT_PATTERN = re.compile(r"\d[\d.,]*[.,]\d{2,3}\b")
+
+
+class PdfTooLargeError(ValueError):
+    pass
+
+
+class MappedPdfFile:
+    """Read-only memory map over a spooled upload; the temp file is deleted on close."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __getattr__(self, name):
+        return getattr(self._mmap, name)
+
+    def close(self):
+        if self._mmap.closed:
+            return
+        self._mmap.close()
+        self._file.close()
+        os.unlink(self.path)
+
+
+def spool_pdf(upload_stream):
+    """Copy an upload into memory when small, or into a memory-mapped temp file when large."""
+    max_bytes = int(os.getenv("PDF_MAX_BYTES", str(25 * 1024 * 1024)))
+    spool_threshold = int(os.getenv("PDF_SPOOL_THRESHOLD", str(5 * 1024 * 1024)))
+
+    upload_stream.seek(0, os.SEEK_END)
+    size = upload_stream.tell()
+    upload_stream.seek(0)
+    if size > max_bytes:
+        raise PdfTooLargeError(f"PDF is {size} bytes, the limit is {max_bytes} bytes")
+    if size <= spool_threshold:
+        return BytesIO(upload_stream.read())
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf", dir=os.getenv("PDF_SPOOL_DIR") or None, delete=False) as spool_file:
+        shutil.copyfileobj(upload_stream, spool_file, COPY_CHUNK_SIZE)
+    return MappedPdfFile(spool_file.name)
+
+
+def pdf_content_hash(pdf_stream) -> str:
+    pdf_stream.seek(0)
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: pdf_stream.read(COPY_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    pdf_stream.seek(0)
+    return digest.hexdigest()
+
+
+def table_to_markdown(table):
+    if not table:
+        return ""
+
+    header, *rows = table
+
+    header = [cell if cell is not None else "" for cell in header]
+    rows = [[cell if cell is not None else "" for cell in row] for row in rows]
+
+    md_lines = ["| " + " | ".join(header) + " |", "| " + " | ".join(["---"] * len(header)) + " |"]
+    for row in rows:
+        md_lines.append("| " + " | ".join(row) + " |")
+
+    return "\n".join(md_lines)
+
+
+def page_to_markdown(page, page_number: int) -> str:
+    return format_page(page_number, page.extract_text(), page.extract_tables())
+
+
+def format_page(page_number: int, page_text: str, tables: list) -> str:
+    output_lines = [f"## Page {page_number}\n"]
+
+    if page_text:
+        output_lines.append(page_text)
+        output_lines.append("\n")
+
+    if tables:
+        output_lines.append("### Detected Table(s):\n")
+        for i, table in enumerate(tables, start=1):
+            output_lines.append(f"**Table {i}:**")
+            md_table = table_to_markdown(table)
+            output_lines.append(md_table)
+            output_lines.append("\n")
+
+    return "\n".join(output_lines)
+
+
+def render_page(page, page_number: int) -> str:
+    try:
+        return page_to_markdown(page, page_number)
+    finally:
+        # Drop the parsed layout objects pdfplumber caches on every page.
+        page.close()
+
+
+def looks_tabular(page_text: str) -> bool:
+    """Cheap stand-in for table detection: count the lines that carry both a date and an amount."""
+    min_rows = int(os.getenv("PDF_TABLE_MIN_ROWS", "3"))
+    rows = sum(1 for line in page_text.splitlines() if DATE_PATTERN.search(line) and AMOUNT_PATTERN.search(line))
+    return rows >= min_rows
+
+
+class ExtractionBackend(ABC):
+    """Renders the pages of one open document as markdown; subclasses are registered in EXTRACTION_BACKENDS."""
+
+    def __init__(self, pdf_source):
+        self._pdf_source = pdf_source
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    @abstractmethod
+    def render(self, index: int) -> str:
+        pass
+
+    def close(self):
+        pass
+
+
+class PdfplumberBackend(ExtractionBackend):
+    """Reference backend: pdfplumber text and table extraction on every page."""
+
+    def __init__(self, pdf_source):
+        super().__init__(pdf_source)
+        self._pdf = pdfplumber.open(pdf_source)
+
+    def __len__(self) -> int:
+        return len(self._pdf.pages)
+
+    def render(self, index: int) -> str:
+        return render_page(self._pdf.pages[index], index + 1)
+
+    def close(self):
+        self._pdf.close()
+
+
+class FastBackend(ExtractionBackend):
+    """PDFium text extraction; pdfplumber only runs table detection on pages that look like transaction listings."""
+
+    def __init__(self, pdf_source):
+        super().__init__(pdf_source)
+        # PDFium reads through readinto(), which the mmap proxy lacks, so spooled files are opened by path.
+        if isinstance(pdf_source, BytesIO):
+            pdfium_source = pdf_source.getvalue()
+        else:
+            pdfium_source = getattr(pdf_source, "path", pdf_source)
+        self._pdfium = pypdfium2.PdfDocument(pdfium_source)
+        self._plumber = None
+
+    def __len__(self) -> int:
+        return len(self._pdfium)
+
+    def render(self, index: int) -> str:
+        page = self._pdfium[index]
+        text_page = page.get_textpage()
+        try:
+            page_text = text_page.get_text_bounded().replace("\r\n", "\n").strip()
+        finally:
+            text_page.close()
+            page.close()
+
+        tables = None
+        if looks_tabular(page_text):
+            if self._plumber is None:
+                self._plumber = pdfplumber.open(self._pdf_source)
+            plumber_page = self._plumber.pages[index]
+            try:
+                tables = plumber_page.extract_tables()
+            finally:
+                plumber_page.close()
+        return format_page(index + 1, page_text, tables)
+
+    def close(self):
+        self._pdfium.close()
+        if self._plumber is not None:
+            self._plumber.close()
+
+
+EXTRACTION_BACKENDS = {
+    "pdfplumber": PdfplumberBackend,
+    "fast": FastBackend,
+}
+
+
+def open_backend(pdf_source, backend: str | None = None) -> ExtractionBackend:
+    backend = backend or os.getenv("PDF_EXTRACTION_BACKEND", "pdfplumber")
+    if backend not in EXTRACTION_BACKENDS:
+        raise ValueError(f"Unknown extraction backend '{backend}', expected one of {tuple(EXTRACTION_BACKENDS)}")
+    return EXTRACTION_BACKENDS[backend](pdf_source)
+
+
+def extract_page_range(pdf_source: bytes | str, start: int, stop: int, backend: str | None = None) -> list[str]:
+    with open_backend(BytesIO(pdf_source) if isinstance(pdf_source, bytes) else pdf_source, backend) as document:
+        return [document.render(index) for index in range(start, stop)]
+
+
+def extraction_workers() -> int:
+    # Every gunicorn worker has its own pool, so by default they split the cores between them.
+    cores_per_worker = (os.cpu_count() or 1) // int(os.getenv("WEB_CONCURRENCY") or 1)
+    return int(os.getenv("PDF_EXTRACTION_WORKERS", "0")) or max(cores_per_worker, 1)
+
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn instead of fork: the parent holds live HTTP and database clients and worker threads.
+            _pool = ProcessPoolExecutor(max_workers=extraction_workers(), mp_context=get_context("spawn"))
+        return _pool
+
+
+def extract_markdown(pdf_stream, backend: str | None = None) -> str:
+    """Render every page as markdown, fanning large documents out to a process pool by page range."""
+    backend = backend or os.getenv("PDF_EXTRACTION_BACKEND", "pdfplumber")
+    workers = extraction_workers()
+    min_pages = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
+    max_pages = int(os.getenv("PDF_MAX_PAGES", "300"))
+    output = StringIO()
+
+    with open_backend(pdf_stream, backend) as document:
+        page_count = len(document)
+        if page_count > max_pages:
+            raise PdfTooLargeError(f"PDF has {page_count} pages, the limit is {max_pages} pages")
+        if workers <= 1 or page_count < min_pages:
+            for index in range(page_count):
+                if index:
+                    output.write("\n")
+                output.write(document.render(index))
+            return output.getvalue()
+
+    # Spooled uploads are reopened by path in each worker instead of shipping the bytes over.
+    pdf_source = getattr(pdf_stream, "path", None)
+    if pdf_source is None:
+        pdf_stream.seek(0)
+        pdf_source = pdf_stream.read()
+    chunk_size = -(-page_count // workers)
+    pool = get_extraction_pool()
+    futures = [pool.submit(extract_page_range, pdf_source, start, min(start + chunk_size, page_count), backend)
+               for start in range(0, page_count, chunk_size)]
+    for future in futures:
+        for page in future.result():
+            if output.tell():
+                output.write("\n")
+            output.write(page)
+    return output.getvalue()
@@ -1,23 +1,43 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from typing import TypedDict, List
+from urllib.parse import urldefrag, urlparse
 
 from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
 from langgraph.constants import START
 from langgraph.graph import StateGraph
 
-from extensions.llm import LLM
-from extensions.tavily_tool import Tavily
+from ..extensions.llm import LLM
+from ..extensions.tavily_tool import Tavily
+
+QUERY_PREFIX_PATTERN = re.compile(r"^\s*d[oó]nde\s+comprar\s+(?:un[oa]?s?\s+)?", re.IGNORECASE)
+LOCATION_SUFFIX_PATTERN = re.compile(r"\s+en\s+ecuador\s*$", re.IGNORECASE)
+
+PRICE_PATTERN = re.compile(
+    r"(?:US\$|USD|\$)\s?\d+(?:[.,]\d+)*|\d+(?:[.,]\d+)*\s?(?:USD|d[oó]lares)",
+    re.IGNORECASE,
+)
+# Rough chars-per-token ratio for Spanish text with the gpt-4o tokenizer; close enough for a truncation budget.
+CHARS_PER_TOKEN = 4
+
+_search_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("TAVILY_SEARCH_WORKERS", "8")),
+    thread_name_prefix="tavily-search",
+)
 
 
 class State(TypedDict):
     question: str
     product: str
     context: List[Document]
+    compact_context: str
     answer: str
 
 
 def extract_product(state: State):
-    llm = LLM.get_llm()
+    llm = LLM.get_llm("query_writer")
     prompt_template = ChatPromptTemplate([
         ("system",
          """
@@ -59,17 +79,85 @@ Formulate the search query as a single-line sentence in Spanish. Ensure the quer
     return state
 
 
+def query_variants(query: str, count: int) -> list[str]:
+    """The query from `extract_product` first, then rephrasings that tend to surface other stores' listings."""
+    product = LOCATION_SUFFIX_PATTERN.sub("", QUERY_PREFIX_PATTERN.sub("", query)).strip()
+    variants = [query, f"precio {product} Ecuador", f"{product} tienda online Ecuador"]
+    return list(dict.fromkeys(variants))[:max(count, 1)]
+
+
+def merge_results(responses: list[dict]) -> list[dict]:
+    """Merge result lists by URL, keeping the best scored copy of each listing."""
+    merged = {}
+    for response in responses:
+        for result in response.get("results", []):
+            url = urldefrag(result.get("url", ""))[0].rstrip("/")
+            if url not in merged or result.get("score", 0) > merged[url].get("score", 0):
+                merged[url] = result
+    return sorted(merged.values(), key=lambda result: result.get("score", 0), reverse=True)
+
+
 def search_product(state: State):
     print(f"Se va a buscar: {state['product']}")
-    tavily_client = Tavily.get_tavily_client()
-    search_results = tavily_client.search(state["product"])
+    variants = query_variants(state["product"], int(os.getenv("TAVILY_QUERY_VARIANTS", "1")))
+    if len(variants) == 1:
+        responses = [Tavily.search(variants[0])]
+    else:
+        responses = list(_search_executor.map(Tavily.search, variants))
+    search_results = merge_results(responses)
     print(f"Resultados de busqueda: {search_results}")
-    state["context"] = search_results["results"]
+    state["context"] = search_results
+    return state
+
+
+def truncate(text: str, max_tokens: int) -> str:
+    text = " ".join(text.split())
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + "…"
+
+
+def table_cell(text: str) -> str:
+    return text.replace("|", "/").replace("\n", " ").strip()
+
+
+def compact_results(state: State):
+    """Shrink the search results to a small table: best listings only, a few per store, prices pulled out."""
+    min_score = float(os.getenv("SHOPPING_MIN_RESULT_SCORE", "0.3"))
+    max_results = int(os.getenv("SHOPPING_MAX_RESULTS", "10"))
+    max_per_domain = int(os.getenv("SHOPPING_MAX_RESULTS_PER_DOMAIN", "2"))
+    token_budget = int(os.getenv("SHOPPING_RESULT_TOKEN_BUDGET", "80"))
+
+    ranked = sorted(state["context"], key=lambda result: result.get("score", 0), reverse=True)
+    # Low-score results are dropped, but never below the five rows the answer table needs.
+    ranked = [result for position, result in enumerate(ranked) if position < 5 or result.get("score", 0) >= min_score]
+
+    selected, seen_urls, per_domain = [], set(), {}
+    for result in ranked:
+        url = urldefrag(result.get("url", ""))[0].rstrip("/")
+        domain = urlparse(url).netloc.removeprefix("www.")
+        if url in seen_urls or per_domain.get(domain, 0) >= max_per_domain:
+            continue
+        seen_urls.add(url)
+        per_domain[domain] = per_domain.get(domain, 0) + 1
+        selected.append((result, url, domain))
+        if len(selected) == max_results:
+            break
+
+    lines = ["| Título | Comercio | Precios detectados | URL | Extracto |", "| --- | --- | --- | --- | --- |"]
+    for result, url, domain in selected:
+        content = result.get("content") or ""
+        prices = list(dict.fromkeys(match.strip() for match in PRICE_PATTERN.findall(f"{result.get('title', '')} "
+                                                                                     f"{content}")))[:3]
+        lines.append(f"| {table_cell(result.get('title', ''))} | {domain} | {table_cell(', '.join(prices)) or '-'} "
+                     f"| {url} | {table_cell(truncate(content, token_budget))} |")
+    state["compact_context"] = "\n".join(lines)
     return state
 
 
 def analyze_results(state: State):
-    llm = LLM.get_llm()
+    llm = LLM.get_llm("generator")
     prompt_template = ChatPromptTemplate([
         ("system",
          """
@@ -116,13 +204,16 @@ Provide a Markdown table with the following columns:
          """),
         ("user", "The users wants: {product}, Results found on Internet: {products}")
     ])
-    messages = prompt_template.invoke({"product": state["question"], "products": state["context"]})
+    messages = prompt_template.invoke({"product": state["question"],
+                                       "products": state.get("compact_context") or state["context"]})
     response = llm.invoke(messages)
     state["answer"] = response.content
     return state
 
 
 def build_shopping_advisor_graph():
-    graph_builder = StateGraph(State).add_sequence([extract_product, search_product, analyze_results])
+    graph_builder = StateGraph(State).add_sequence(
+        [extract_product, search_product, compact_results, analyze_results]
+    )
     graph_builder.add_edge(START, "extract_product")
     return graph_builder.compile()
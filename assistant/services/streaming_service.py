@@ -0,0 +1,33 @@
+from typing import Iterator
+
+from common.sse import format_sse
+from flask import Response, stream_with_context
+from langgraph.graph.state import CompiledStateGraph
+
+
+def stream_answer_events(graph: CompiledStateGraph, inputs: dict, answer_node: str) -> Iterator[str]:
+    """Yield SSE events for the tokens the LLM produces inside `answer_node`, followed by a `done` event."""
+    final_state = {}
+    try:
+        for mode, payload in graph.stream(inputs, stream_mode=["messages", "values"]):
+            if mode == "values":
+                final_state = payload
+                continue
+            chunk, metadata = payload
+            if metadata.get("langgraph_node") == answer_node and chunk.content:
+                yield format_sse({"token": chunk.content})
+    except Exception as error:
+        yield format_sse({"message": str(error)}, event="error")
+        return
+    done = {"question": inputs["question"]}
+    if final_state.get("statement_id"):
+        done["statement_id"] = final_state["statement_id"]
+    yield format_sse(done, event="done")
+
+
+def sse_response(events: Iterator[str]) -> Response:
+    return Response(
+        stream_with_context(events),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
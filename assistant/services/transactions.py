@@ -0,0 +1,245 @@
+import re
+import unicodedata
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+
+DATE_HEADERS = ("fecha", "date")
+MERCHANT_HEADERS = ("descripcion", "concepto", "establecimiento", "comercio", "detalle", "description", "merchant",
+                    "movimiento")
+DEBIT_HEADERS = ("cargo", "debito", "retiro", "debit", "withdrawal")
+CREDIT_HEADERS = ("abono", "credito", "deposito", "credit", "deposit")
+AMOUNT_HEADERS = ("monto", "importe", "valor", "amount")
+TYPE_HEADERS = ("tipo", "type", "naturaleza")
+IGNORED_HEADERS = ("saldo", "balance")
+
+# How an unsigned amount column tells deposits apart: a type column holding one of these values, or a description
+# starting with one of these prefixes.
+CREDIT_TYPES = ("c", "cr", "credito", "abono", "deposito", "credit", "deposit")
+CREDIT_DESCRIPTIONS = ("deposito", "abono", "transferencia recibida", "pago recibido", "nomina", "devolucion",
+                       "reverso", "interes ganado", "deposit", "payment received", "refund")
+
+DATE_FORMATS = ("%d/%m/%Y", "%d/%m/%y", "%Y-%m-%d", "%d-%m-%Y", "%d-%m-%y", "%d.%m.%Y")
+AMOUNT_PATTERN = re.compile(r"[\d.,]+")
+WORD_PATTERN = re.compile(r"\w{4,}")
+
+TOP_EXPENSES = 5
+TOP_MERCHANTS = 10
+MAX_RELATED_ROWS = 20
+
+
+@dataclass
+class Transactions:
+    """Expenses of a statement stored column-wise: one numpy array per field."""
+    dates: np.ndarray
+    merchants: np.ndarray
+    amounts: np.ndarray
+
+    def __len__(self):
+        return len(self.amounts)
+
+
+def normalize_header(cell: str) -> str:
+    text = unicodedata.normalize("NFKD", cell or "").encode("ascii", "ignore").decode("ascii")
+    return " ".join(text.lower().split())
+
+
+def parse_amount(cell: str) -> float:
+    text = (cell or "").replace("$", "").replace("USD", "").replace("COP", "").replace(" ", "").strip()
+    negative = text.startswith(("-", "(")) or text.endswith("-")
+    digits = text.strip("-+()")
+    if not digits or not AMOUNT_PATTERN.fullmatch(digits):
+        return np.nan
+
+    if "," in digits and "." in digits:
+        decimal_separator = "," if digits.rfind(",") > digits.rfind(".") else "."
+    elif digits.count(",") == 1 and len(digits.rpartition(",")[2]) != 3:
+        decimal_separator = ","
+    elif digits.count(".") == 1 and len(digits.rpartition(".")[2]) != 3:
+        decimal_separator = "."
+    else:
+        # A single separator followed by three digits, or a repeated one, groups thousands.
+        decimal_separator = None
+
+    thousands_separator = {",": ".", ".": ",", None: None}[decimal_separator]
+    if thousands_separator:
+        digits = digits.replace(thousands_separator, "")
+    if decimal_separator:
+        digits = digits.replace(decimal_separator, ".")
+    else:
+        digits = digits.replace(",", "").replace(".", "")
+    try:
+        amount = float(digits)
+    except ValueError:
+        return np.nan
+    return -amount if negative else amount
+
+
+def parse_date(cell: str) -> np.datetime64:
+    text = (cell or "").strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return np.datetime64(datetime.strptime(text, date_format).date())
+        except ValueError:
+            continue
+    return np.datetime64("NaT")
+
+
+def iter_markdown_tables(markdown: str):
+    """Yield the rows (lists of cells) of every markdown table, rejoining cells pdfplumber split across lines."""
+    table, row = [], None
+    for line in markdown.splitlines():
+        stripped = line.strip()
+        if row is not None:
+            row += " " + stripped
+        elif stripped.startswith("|"):
+            row = stripped
+        else:
+            if table:
+                yield table
+                table = []
+            continue
+        if row.endswith("|") and len(row) > 1:
+            cells = [cell.strip() for cell in row[1:-1].split(" | ")]
+            if not all(set(cell) <= {"-"} for cell in cells):
+                table.append(cells)
+            row = None
+    if table:
+        yield table
+
+
+COLUMN_HEADERS = {
+    "date": DATE_HEADERS,
+    "merchant": MERCHANT_HEADERS,
+    "debit": DEBIT_HEADERS,
+    "credit": CREDIT_HEADERS,
+    "amount": AMOUNT_HEADERS,
+    "type": TYPE_HEADERS,
+}
+
+
+def detect_columns(header: list[str]) -> dict | None:
+    header = [normalize_header(cell) for cell in header]
+    columns, taken = {}, set()
+    for column, keywords in COLUMN_HEADERS.items():
+        # First match wins, so "Fecha valor" is the date column and not the amount one.
+        columns[column] = next((index for index, cell in enumerate(header)
+                                if index not in taken and not any(ignored in cell for ignored in IGNORED_HEADERS)
+                                and any(keyword in cell for keyword in keywords)), None)
+        taken.add(columns[column])
+    if columns["merchant"] is None or (columns["debit"] is None and columns["amount"] is None):
+        return None
+    return columns
+
+
+def is_credit_row(row: list[str], columns: dict) -> bool:
+    if columns["type"] is not None and normalize_header(row[columns["type"]]) in CREDIT_TYPES:
+        return True
+    return normalize_header(row[columns["merchant"]]).startswith(CREDIT_DESCRIPTIONS)
+
+
+def parse_transactions(markdown: str) -> Transactions:
+    """Collect the expenses listed in the statement tables produced by `table_to_markdown`.
+
+    Separate debit and credit columns are read as such. A single amount column is signed when any entry is negative,
+    and its negative entries are the charges. When it is unsigned, rows marked as credits by a type column or a
+    description such as "Depósito" or "Abono" are dropped and every other row counts as an expense, so deposits
+    described in any other way are still counted.
+    """
+    dates, merchants, amounts, signed_columns, credits = [], [], [], [], []
+    columns, width = None, 0
+    for table in iter_markdown_tables(markdown):
+        header_columns = detect_columns(table[0])
+        if header_columns is not None:
+            columns, width, rows = header_columns, len(table[0]), table[1:]
+        elif columns is not None and len(table[0]) == width:
+            # Continuation pages often repeat the table without its header row.
+            rows = table
+        else:
+            continue
+
+        signed = columns["debit"] is None
+        for row in rows:
+            if len(row) != width:
+                continue
+            amount = parse_amount(row[columns["debit"] if not signed else columns["amount"]])
+            if np.isnan(amount) or amount == 0:
+                continue
+            dates.append(parse_date(row[columns["date"]]) if columns["date"] is not None else np.datetime64("NaT"))
+            merchants.append(" ".join(row[columns["merchant"]].upper().split()))
+            amounts.append(amount)
+            signed_columns.append(signed)
+            credits.append(signed and is_credit_row(row, columns))
+
+    amounts = np.array(amounts, dtype=np.float64)
+    signed_columns = np.array(signed_columns, dtype=bool)
+    credits = np.array(credits, dtype=bool)
+    # In a single signed amount column, charges are the negative entries whenever any entry is negative.
+    if signed_columns.any() and (amounts[signed_columns] < 0).any():
+        keep = ~signed_columns | (amounts < 0)
+    else:
+        keep = (amounts > 0) & ~credits
+    return Transactions(
+        dates=np.array(dates, dtype="datetime64[D]")[keep],
+        merchants=np.array(merchants, dtype=str)[keep],
+        amounts=np.abs(amounts[keep]),
+    )
+
+
+def top_expenses(transactions: Transactions, n: int = TOP_EXPENSES) -> np.ndarray:
+    return np.argsort(-transactions.amounts, kind="stable")[:n]
+
+
+def merchant_totals(transactions: Transactions) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return merchants, their totals and transaction counts, ordered by descending total."""
+    merchants, inverse = np.unique(transactions.merchants, return_inverse=True)
+    totals = np.bincount(inverse, weights=transactions.amounts)
+    counts = np.bincount(inverse)
+    order = np.argsort(-totals, kind="stable")
+    return merchants[order], totals[order], counts[order]
+
+
+def related_rows(transactions: Transactions, question: str) -> np.ndarray:
+    words = {word.upper() for word in WORD_PATTERN.findall(normalize_header(question))}
+    if not words:
+        return np.array([], dtype=int)
+    mask = np.array([any(word in merchant for word in words) for merchant in transactions.merchants], dtype=bool)
+    return np.flatnonzero(mask)[:MAX_RELATED_ROWS]
+
+
+def format_date(date: np.datetime64) -> str:
+    return "" if np.isnat(date) else str(date)
+
+
+def format_amount(amount: float) -> str:
+    return f"{amount:,.2f}"
+
+
+def rows_to_markdown(transactions: Transactions, indexes: np.ndarray) -> list[str]:
+    lines = ["| Fecha | Establecimiento | Monto |", "| --- | --- | --- |"]
+    for index in indexes:
+        lines.append(f"| {format_date(transactions.dates[index])} | {transactions.merchants[index]} | "
+                     f"{format_amount(transactions.amounts[index])} |")
+    return lines
+
+
+def summarize_transactions(transactions: Transactions, question: str) -> str:
+    """Render the exact aggregates the analysis prompt asks for, plus the rows the question mentions."""
+    known_dates = transactions.dates[~np.isnat(transactions.dates)]
+    period = f" entre {known_dates.min()} y {known_dates.max()}" if len(known_dates) else ""
+    lines = [f"Gastos analizados: {len(transactions)} por un total de {format_amount(transactions.amounts.sum())}"
+             f"{period}.", "", f"### Top {TOP_EXPENSES} gastos individuales"]
+    lines += rows_to_markdown(transactions, top_expenses(transactions))
+
+    merchants, totals, counts = merchant_totals(transactions)
+    lines += ["", f"### Gastos agrupados por establecimiento (top {TOP_MERCHANTS} por total)",
+              "| Establecimiento | Transacciones | Total |", "| --- | --- | --- |"]
+    for merchant, total, count in zip(merchants[:TOP_MERCHANTS], totals, counts):
+        lines.append(f"| {merchant} | {count} | {format_amount(total)} |")
+
+    related = related_rows(transactions, question)
+    if len(related):
+        lines += ["", "### Movimientos relacionados con la pregunta"]
+        lines += rows_to_markdown(transactions, related)
+    return "\n".join(lines)
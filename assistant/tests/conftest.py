@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The repository root, which holds the `assistant` package and the shared `common` one. It goes first so the
+# `assistant` directory wins over its own `assistant.py` when pytest runs from inside it.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -0,0 +1,40 @@
+import sqlite3
+
+from assistant.extensions.cache import PersistentTTLCache, normalize_query
+
+
+def test_normalize_query():
+    assert normalize_query("  Mejores   LAPTOPS\tEcuador ") == "mejores laptops ecuador"
+
+
+def test_persistent_entries_are_shared_through_the_file(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    PersistentTTLCache(10, path, "searches").set("q", {"results": [1]}, 60)
+
+    cache = PersistentTTLCache(10, path, "searches")
+    assert cache.get("q") == {"results": [1]}
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_locked_writes_are_skipped(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = PersistentTTLCache(10, path, "searches")
+    cache._disk.execute("PRAGMA busy_timeout=0")
+    writer = sqlite3.connect(path, isolation_level=None)
+    writer.execute("BEGIN EXCLUSIVE")
+    try:
+        cache.set("q", {"results": [1]}, 60)
+    finally:
+        writer.execute("ROLLBACK")
+
+    assert cache.get("q") == {"results": [1]}
+    assert PersistentTTLCache(10, path, "searches").get("q") is None
+    assert cache.stats()["disk_errors"] >= 1
+
+
+def test_failed_reads_are_misses(tmp_path):
+    cache = PersistentTTLCache(10, str(tmp_path / "cache.sqlite3"), "searches")
+    cache._disk.execute("DROP TABLE searches")
+
+    assert cache.get("q") is None
+    assert cache.stats()["disk_errors"] == 1
@@ -0,0 +1,43 @@
+import sqlite3
+
+from assistant.extensions.embedding_cache import CachedEmbeddings
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text: str) -> list[float]:
+        self.calls += 1
+        return [float(len(text)), 0.5]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+def test_disk_tier_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    embedder = CountingEmbedder()
+    CachedEmbeddings(embedder, "model", 10, path).embed_query("¿Qué es  un ETF?")
+
+    cache = CachedEmbeddings(embedder, "model", 10, path)
+    assert cache.embed_query("¿qué es un etf?") == [16.0, 0.5]
+    assert embedder.calls == 1
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_locked_database_is_a_miss_not_an_error(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    embedder = CountingEmbedder()
+    cache = CachedEmbeddings(embedder, "model", 10, path)
+    cache._disk.execute("PRAGMA busy_timeout=0")
+    writer = sqlite3.connect(path, isolation_level=None)
+    writer.execute("BEGIN EXCLUSIVE")
+    try:
+        assert cache.embed_query("presupuesto") == [11.0, 0.5]
+    finally:
+        writer.execute("ROLLBACK")
+
+    assert embedder.calls == 1
+    # WAL readers are not blocked by the writer, so only the write is skipped.
+    assert cache.stats()["disk_errors"] == 1
@@ -0,0 +1,68 @@
+import pytest
+
+from assistant.ingest import discover, prune
+
+
+def write(path, text="x"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+
+def test_sources_are_keyed_by_path_under_the_ingestion_root(tmp_path):
+    write(tmp_path / "kb" / "credit" / "guide.md")
+    write(tmp_path / "kb" / "savings" / "guide.md")
+    write(tmp_path / "kb" / "notes.txt")
+
+    files = discover([str(tmp_path / "kb")])
+
+    assert sorted(files) == ["credit/guide.md", "savings/guide.md"]
+    assert files["credit/guide.md"] == (str(tmp_path / "kb" / "credit" / "guide.md"), str(tmp_path / "kb"))
+
+
+def test_a_file_given_directly_is_keyed_by_its_name(tmp_path):
+    path = write(tmp_path / "kb" / "guide.md")
+
+    assert discover([str(path)]) == {"guide.md": (str(path), str(tmp_path / "kb"))}
+
+
+def test_colliding_sources_are_rejected(tmp_path):
+    write(tmp_path / "a" / "guide.md")
+    write(tmp_path / "b" / "guide.md")
+
+    with pytest.raises(SystemExit):
+        discover([str(tmp_path / "a"), str(tmp_path / "b")])
+
+
+class Collection:
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.deleted = []
+
+    def find(self, query, projection):
+        return [row for row in self.rows if row["_id"] not in query["_id"]["$nin"]]
+
+    def delete_many(self, query):
+        self.deleted.append(query)
+
+
+def test_prune_deletes_stale_sources_of_the_given_roots():
+    files = {"credit/guide.md": ("kb/credit/guide.md", "/kb")}
+    manifest = Collection([{"_id": "credit/guide.md", "root": "/kb"}, {"_id": "credit/old.md", "root": "/kb"},
+                           {"_id": "guide.md"}])
+    chunks = Collection()
+
+    assert prune(chunks, manifest, files, dry_run=True) == "would prune 2 sources: credit/old.md, guide.md"
+    assert chunks.deleted == [] and manifest.deleted == []
+    assert prune(chunks, manifest, files, dry_run=False) == "pruned 2 sources: credit/old.md, guide.md"
+    assert chunks.deleted == [{"source": {"$in": ["credit/old.md", "guide.md"]}}]
+
+
+def test_prune_refuses_to_delete_sources_of_roots_not_given():
+    files = {"guide.md": ("kb/credit/guide.md", "/kb/credit")}
+    manifest = Collection([{"_id": "savings/plan.md", "root": "/kb"}, {"_id": "legacy.md"}])
+
+    with pytest.raises(SystemExit, match="/kb, an unknown directory"):
+        prune(Collection(), manifest, files, dry_run=False)
+    assert manifest.deleted == []
+
@@ -0,0 +1,70 @@
+import os
+import time
+
+import pytest
+
+from assistant.extensions import job_queue
+from assistant.extensions.job_queue import JobQueue, JobQueueFullError
+
+
+@pytest.fixture
+def queue(monkeypatch, tmp_path):
+    monkeypatch.setenv("PDF_JOB_DIR", str(tmp_path))
+    monkeypatch.setenv("PDF_JOB_WORKERS", "1")
+    monkeypatch.setenv("PDF_JOB_MAX_QUEUED", "0")
+    monkeypatch.setattr(JobQueue, "_executor", None)
+    monkeypatch.setattr(JobQueue, "_last_purge", 0.0)
+    JobQueue.init_app()
+    yield JobQueue
+    JobQueue._executor.shutdown(wait=True)
+
+
+def wait_for(job_id: str) -> dict:
+    for _ in range(100):
+        record = JobQueue.get(job_id)
+        if record["status"] in ("succeeded", "failed"):
+            return record
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_job_result_and_failure_are_recorded(queue):
+    assert wait_for(queue.submit(lambda: {"answer": 42}))["result"] == {"answer": 42}
+    assert wait_for(queue.submit(lambda: 1 / 0))["error"] == "division by zero"
+    assert queue.get("not-a-job-id") is None
+
+
+def test_full_queue_rejects_jobs(queue):
+    queue.submit(lambda: time.sleep(0.2))
+    with pytest.raises(JobQueueFullError):
+        queue.submit(lambda: None)
+
+
+def test_expired_records_are_securely_deleted(queue, monkeypatch, tmp_path):
+    deleted = []
+    monkeypatch.setattr(job_queue, "secure_delete", lambda path: deleted.append(path) or os.unlink(path))
+    job_id = queue.submit(lambda: {"answer": "analysis"})
+    wait_for(job_id)
+    old = time.time() - 2 * queue._ttl
+    os.utime(queue._path(job_id), (old, old))
+
+    monkeypatch.setattr(JobQueue, "_last_purge", 0.0)
+    wait_for(queue.submit(lambda: None))
+
+    assert deleted == [queue._path(job_id)]
+    assert queue.get(job_id) is None
+
+
+def test_records_are_private_and_leftover_temporary_files_are_purged(queue, monkeypatch):
+    job_id = wait_for(queue.submit(lambda: {"answer": "analysis"}))["job_id"]
+    assert os.stat(queue._path(job_id)).st_mode & 0o777 == 0o600
+
+    leftover = f"{queue._path('0' * 32)}.tmp"
+    with open(leftover, "w", encoding="utf-8") as leftover_file:
+        leftover_file.write("{}")
+    old = time.time() - 2 * queue._ttl
+    os.utime(leftover, (old, old))
+    monkeypatch.setattr(JobQueue, "_last_purge", 0.0)
+    wait_for(queue.submit(lambda: None))
+
+    assert not os.path.exists(leftover)
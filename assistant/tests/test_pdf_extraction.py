@@ -0,0 +1,36 @@
+import os
+from io import BytesIO
+
+import pytest
+
+from assistant.services.pdf_extraction import (EXTRACTION_BACKENDS, ExtractionBackend, MappedPdfFile, open_backend,
+                                               spool_pdf)
+
+
+def test_small_uploads_stay_in_memory(monkeypatch):
+    monkeypatch.setenv("PDF_SPOOL_THRESHOLD", "1024")
+    assert isinstance(spool_pdf(BytesIO(b"%PDF-1.4 small")), BytesIO)
+
+
+def test_spooled_upload_can_be_closed_twice(monkeypatch, tmp_path):
+    monkeypatch.setenv("PDF_SPOOL_THRESHOLD", "4")
+    monkeypatch.setenv("PDF_SPOOL_DIR", str(tmp_path))
+
+    spooled = spool_pdf(BytesIO(b"%PDF-1.4 spooled upload"))
+    assert isinstance(spooled, MappedPdfFile)
+    assert spooled.read(8) == b"%PDF-1.4"
+
+    spooled.close()
+    spooled.close()
+    assert not os.path.exists(spooled.path)
+
+
+def test_an_incomplete_backend_fails_when_opened(monkeypatch):
+    class TextOnlyBackend(ExtractionBackend):
+        def __len__(self) -> int:
+            return 1
+
+    monkeypatch.setitem(EXTRACTION_BACKENDS, "text_only", TextOnlyBackend)
+
+    with pytest.raises(TypeError):
+        open_backend(BytesIO(b"%PDF-1.4"), "text_only")
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from assistant.services.transactions import merchant_totals, parse_amount, parse_transactions, top_expenses
+
+
+@pytest.mark.parametrize("cell, expected", [
+    ("1.234,56", 1234.56),
+    ("1,234.56", 1234.56),
+    ("1.234.567", 1234567.0),
+    ("1,234", 1234.0),
+    ("1.234", 1234.0),
+    ("12,5", 12.5),
+    ("0,99", 0.99),
+    ("45.10", 45.1),
+    ("$ 12,000", 12000.0),
+    ("USD 7.50", 7.5),
+    ("-45.00", -45.0),
+    ("45.00-", -45.0),
+    ("(45.00)", -45.0),
+    ("+20.00", 20.0),
+])
+def test_parse_amount(cell, expected):
+    assert parse_amount(cell) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("cell", ["", None, "N/A", "abc", "12/05/2024"])
+def test_parse_amount_rejects_non_amounts(cell):
+    assert np.isnan(parse_amount(cell))
+
+
+DEBIT_CREDIT_TABLE = """
+| Fecha | Descripción | Débito | Crédito | Saldo |
+| --- | --- | --- | --- | --- |
+| 01/03/2024 | Supermaxi | 120,50 |  | 879,50 |
+| 02/03/2024 | Depósito nómina |  | 1.500,00 | 2.379,50 |
+| 05/03/2024 | Netflix | 10,99 |  | 2.368,51 |
+"""
+
+SIGNED_TABLE = """
+| Fecha | Concepto | Monto |
+| --- | --- | --- |
+| 2024-03-01 | SUPERMAXI | -120.50 |
+| 2024-03-02 | TRANSFERENCIA RECIBIDA | 1500.00 |
+| 2024-03-05 | NETFLIX | -10.99 |
+"""
+
+UNSIGNED_WITH_TYPE_TABLE = """
+| Fecha | Detalle | Tipo | Valor |
+| --- | --- | --- | --- |
+| 01/03/2024 | Supermaxi | Débito | 120.50 |
+| 02/03/2024 | Transferencia Juan Pérez | Crédito | 1500.00 |
+| 05/03/2024 | Netflix | DB | 10.99 |
+"""
+
+UNSIGNED_WITH_DESCRIPTIONS_TABLE = """
+| Fecha | Descripción | Monto |
+| --- | --- | --- |
+| 01/03/2024 | Supermaxi | 120.50 |
+| 02/03/2024 | Depósito en efectivo | 1500.00 |
+| 03/03/2024 | Abono por reverso | 35.00 |
+| 05/03/2024 | Netflix | 10.99 |
+"""
+
+
+@pytest.mark.parametrize("markdown", [DEBIT_CREDIT_TABLE, SIGNED_TABLE, UNSIGNED_WITH_TYPE_TABLE,
+                                      UNSIGNED_WITH_DESCRIPTIONS_TABLE],
+                         ids=["debit_credit", "signed", "unsigned_with_type", "unsigned_with_descriptions"])
+def test_deposits_are_not_expenses(markdown):
+    transactions = parse_transactions(markdown)
+
+    assert list(transactions.merchants) == ["SUPERMAXI", "NETFLIX"]
+    assert transactions.amounts.tolist() == pytest.approx([120.5, 10.99])
+
+
+def test_continuation_tables_without_header_are_read():
+    continuation = """
+| 10/03/2024 | Kfc | 8,75 |  | 2.359,76 |
+| 11/03/2024 | Supermaxi | 60,00 |  | 2.299,76 |
+"""
+    transactions = parse_transactions(DEBIT_CREDIT_TABLE + "\nPágina 2\n" + continuation)
+
+    assert list(transactions.merchants) == ["SUPERMAXI", "NETFLIX", "KFC", "SUPERMAXI"]
+    assert transactions.dates[2] == np.datetime64("2024-03-10")
+    merchants, totals, counts = merchant_totals(transactions)
+    assert merchants[0] == "SUPERMAXI" and totals[0] == pytest.approx(180.5) and counts[0] == 2
+    assert transactions.amounts[top_expenses(transactions, 1)[0]] == pytest.approx(120.5)
+
+
+def test_value_date_header_is_not_read_as_the_amount():
+    markdown = """
+| Fecha valor | Descripción | Monto |
+| --- | --- | --- |
+| 01/03/2024 | Supermaxi | -120.50 |
+"""
+    transactions = parse_transactions(markdown)
+
+    assert transactions.dates[0] == np.datetime64("2024-03-01")
+    assert transactions.amounts.tolist() == [120.5]
+
+
+def test_tables_without_an_amount_column_are_ignored():
+    assert len(parse_transactions("| Producto | Tasa |\n| --- | --- |\n| Ahorro | 5% |\n")) == 0
@@ -0,0 +1,68 @@
+import os
+
+from langchain_openai import ChatOpenAI
+
+from common.rate_limiter import PriorityRateLimiter, ProfileRateLimiter, TokenUsageCallback, build_rate_limiter
+
+
+def profile_settings(name: str, defaults: dict) -> dict:
+    """Apply the LLM_<PROFILE>_MODEL, _MAX_TOKENS, _TIMEOUT and _MAX_RETRIES overrides to a profile's settings."""
+    prefix = f"LLM_{name.upper()}_"
+    settings = dict(defaults)
+    if os.getenv(f"{prefix}MODEL"):
+        settings["model"] = os.getenv(f"{prefix}MODEL")
+    for key, cast in (("max_tokens", int), ("timeout", float), ("max_retries", int)):
+        if os.getenv(f"{prefix}{key.upper()}"):
+            settings[key] = cast(os.getenv(f"{prefix}{key.upper()}"))
+    return settings
+
+
+class ProfiledLLM:
+    """One ChatOpenAI client per named profile, all drawing from one OpenAI rate limiter.
+
+    Each service subclasses it with its own PROFILES (name -> ChatOpenAI settings, including "default") and
+    RATE_LIMITS (name -> (priority, expected tokens per call)).
+    """
+    PROFILES = {}
+    RATE_LIMITS = {}
+    _llm_instance = None
+    _profiles = {}
+    _rate_limiter = None
+
+    @classmethod
+    def init_app(cls, rate_limiter: PriorityRateLimiter | None = None):
+        if cls._llm_instance is None:
+            cls._rate_limiter = rate_limiter or build_rate_limiter()
+            cls._profiles = {
+                name: ChatOpenAI(temperature=0, **profile_settings(name, defaults), **cls._rate_limit_settings(name))
+                for name, defaults in cls.PROFILES.items()
+            }
+            cls._llm_instance = cls._profiles["default"]
+
+    @classmethod
+    def _rate_limit_settings(cls, profile: str) -> dict:
+        if cls._rate_limiter is None:
+            return {}
+        priority, expected_tokens = cls.RATE_LIMITS[profile]
+        return {
+            "rate_limiter": ProfileRateLimiter(cls._rate_limiter, priority, expected_tokens),
+            "callbacks": [TokenUsageCallback(cls._rate_limiter, expected_tokens)],
+        }
+
+    @classmethod
+    def get_llm(cls, profile: str = "default"):
+        if cls._llm_instance is None:
+            raise RuntimeError("Database not initialized. Call init_app first")
+        if profile not in cls._profiles:
+            raise ValueError(f"Unknown LLM profile '{profile}', expected one of {tuple(cls._profiles)}")
+        return cls._profiles[profile]
+
+    @classmethod
+    def get_rate_limiter(cls) -> PriorityRateLimiter | None:
+        return cls._rate_limiter
+
+    @classmethod
+    def stats(cls) -> dict:
+        if cls._rate_limiter is None:
+            return {"enabled": False}
+        return {"enabled": True, **cls._rate_limiter.stats()}
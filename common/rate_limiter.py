@@ -0,0 +1,216 @@
+import asyncio
+import fcntl
+import heapq
+import itertools
+import json
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from threading import Condition
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.rate_limiters import BaseRateLimiter
+
+
+class LocalBuckets:
+    """Requests-per-minute and tokens-per-minute token buckets for this process; a rate of 0 means unlimited."""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self._capacity = [requests_per_minute or float("inf"), tokens_per_minute or float("inf")]
+        self._levels = list(self._capacity)
+        self._updated = self._clock()
+
+    @staticmethod
+    def _clock() -> float:
+        return time.monotonic()
+
+    def _refill(self):
+        now = self._clock()
+        elapsed = max(now - self._updated, 0.0)
+        self._levels = [min(capacity, level + capacity * elapsed / 60)
+                        for capacity, level in zip(self._capacity, self._levels)]
+        self._updated = now
+
+    def try_consume(self, tokens: int, priority: int = 0) -> float:
+        """Take one request and `tokens` if both buckets allow it; otherwise return the seconds to wait.
+
+        `priority` is that of the call asking, which only buckets shared between processes look at.
+        """
+        self._refill()
+        # A call larger than the whole bucket only waits for a full bucket instead of forever.
+        needed = [1.0, min(float(tokens), self._capacity[1])]
+        wait = max((need - level) * 60 / capacity if capacity != float("inf") else 0.0
+                   for need, level, capacity in zip(needed, self._levels, self._capacity))
+        if wait > 0:
+            return wait
+        self._levels = [level - need for level, need in zip(self._levels, needed)]
+        return 0.0
+
+    def adjust_tokens(self, delta: int):
+        """Charge (or refund, when negative) the difference between estimated and reported token usage."""
+        self._refill()
+        self._levels[1] = min(self._capacity[1], self._levels[1] - delta)
+
+    def withdraw(self):
+        """Forget this process's waiting call once none is left; only buckets shared between processes track it."""
+
+
+class FileBuckets(LocalBuckets):
+    """The same buckets kept in a shared file, so all gunicorn workers draw from one quota.
+
+    The file also holds the priority each worker's first waiting call is polling with, so a worker yields to a
+    more urgent call waiting in another one. An entry expires shortly after its call's next poll was due, which
+    drops those of crashed workers.
+    """
+
+    # How often a worker polls again while another worker's more urgent call is waiting.
+    YIELD_SECONDS = 0.25
+    EXPIRY_GRACE_SECONDS = 1.0
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, path: str):
+        super().__init__(requests_per_minute, tokens_per_minute)
+        self._path = path
+        self._waiting = {}
+        self._registered = False
+
+    @staticmethod
+    def _clock() -> float:
+        return time.time()
+
+    @contextmanager
+    def _shared_state(self):
+        with open(self._path, "a+", encoding="utf-8") as state_file:
+            fcntl.flock(state_file, fcntl.LOCK_EX)
+            state_file.seek(0)
+            raw_state = state_file.read()
+            if raw_state:
+                state = json.loads(raw_state)
+                self._levels, self._updated = state["levels"], state["updated"]
+                self._waiting = state.get("waiting", {})
+            yield
+            state_file.seek(0)
+            state_file.truncate()
+            json.dump({"levels": self._levels, "updated": self._updated, "waiting": self._waiting}, state_file)
+
+    def _key(self) -> str:
+        return f"{os.getpid()}-{id(self)}"
+
+    def try_consume(self, tokens: int, priority: int = 0) -> float:
+        with self._shared_state():
+            now = self._clock()
+            key = self._key()
+            self._waiting = {other: entry for other, entry in self._waiting.items()
+                             if other != key and entry[1] > now}
+            if any(other_priority < priority for other_priority, _ in self._waiting.values()):
+                wait = self.YIELD_SECONDS
+            else:
+                wait = super().try_consume(tokens, priority)
+            self._registered = wait > 0
+            if self._registered:
+                self._waiting[key] = [priority, now + wait + self.EXPIRY_GRACE_SECONDS]
+            return wait
+
+    def adjust_tokens(self, delta: int):
+        with self._shared_state():
+            super().adjust_tokens(delta)
+
+    def withdraw(self):
+        if not self._registered:
+            return
+        with self._shared_state():
+            self._waiting.pop(self._key(), None)
+            self._registered = False
+
+
+class PriorityRateLimiter:
+    """Admits outbound calls in priority order (lower first, FIFO within a priority) as the buckets refill.
+
+    With FileBuckets the order also holds across workers, except that calls of equal priority in different workers
+    are admitted in no particular order.
+    """
+
+    def __init__(self, buckets: LocalBuckets):
+        self._buckets = buckets
+        self._condition = Condition()
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._acquired = 0
+        self._total_wait = 0.0
+
+    def acquire(self, priority: int, tokens: int, blocking: bool = True) -> bool:
+        started = time.monotonic()
+        with self._condition:
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    wait = None
+                    if self._waiting[0] == ticket:
+                        wait = self._buckets.try_consume(tokens, priority)
+                        if wait == 0:
+                            self._acquired += 1
+                            self._total_wait += time.monotonic() - started
+                            return True
+                    if not blocking:
+                        return False
+                    # Only the head polls the buckets; the others sleep until the head changes.
+                    self._condition.wait(timeout=wait)
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                if not self._waiting:
+                    self._buckets.withdraw()
+                self._condition.notify_all()
+
+    def adjust_tokens(self, delta: int):
+        with self._condition:
+            self._buckets.adjust_tokens(delta)
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "queue_depth": len(self._waiting),
+                "waiting_by_priority": dict(Counter(priority for priority, _ in self._waiting)),
+                "acquired": self._acquired,
+                "average_wait": self._total_wait / self._acquired if self._acquired else 0.0,
+            }
+
+
+class ProfileRateLimiter(BaseRateLimiter):
+    """Adapts the shared limiter to one LLM profile, with that profile's priority and token estimate."""
+
+    def __init__(self, limiter: PriorityRateLimiter, priority: int, expected_tokens: int):
+        self._limiter = limiter
+        self._priority = priority
+        self._expected_tokens = expected_tokens
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        return self._limiter.acquire(self._priority, self._expected_tokens, blocking)
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        return await asyncio.to_thread(self.acquire, blocking=blocking)
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """Replaces a call's estimated token reservation with the usage OpenAI reports."""
+
+    def __init__(self, limiter: PriorityRateLimiter, expected_tokens: int):
+        self._limiter = limiter
+        self._expected_tokens = expected_tokens
+
+    def on_llm_end(self, response, **kwargs):
+        total_tokens = ((response.llm_output or {}).get("token_usage") or {}).get("total_tokens")
+        if total_tokens:
+            self._limiter.adjust_tokens(total_tokens - self._expected_tokens)
+
+
+def build_rate_limiter() -> PriorityRateLimiter | None:
+    requests_per_minute = float(os.getenv("OPENAI_RATE_LIMIT_RPM") or 0)
+    tokens_per_minute = float(os.getenv("OPENAI_RATE_LIMIT_TPM") or 0)
+    if not requests_per_minute and not tokens_per_minute:
+        return None
+    state_file = os.getenv("OPENAI_RATE_LIMIT_STATE_FILE")
+    if state_file:
+        return PriorityRateLimiter(FileBuckets(requests_per_minute, tokens_per_minute, state_file))
+    return PriorityRateLimiter(LocalBuckets(requests_per_minute, tokens_per_minute))
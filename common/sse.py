@@ -0,0 +1,7 @@
+import json
+
+
+def format_sse(data: dict, event: str | None = None) -> str:
+    """Encode one Server-Sent Events frame, the wire format both services stream answers in."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
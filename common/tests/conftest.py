@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The repository root, which holds the `common` package.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
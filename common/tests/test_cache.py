@@ -0,0 +1,14 @@
+from common.cache import TTLCache
+
+
+def test_ttl_cache_evicts_least_recently_used_and_expired_entries():
+    cache = TTLCache(2)
+    cache.set("a", 1, 60)
+    cache.set("b", 2, 60)
+    cache.get("a")
+    cache.set("c", 3, 60)
+    cache.set("d", 4, -1)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("d") is None
@@ -0,0 +1,146 @@
+import threading
+import time
+
+import httpx
+import pytest
+from langchain_openai import ChatOpenAI
+
+from common.rate_limiter import FileBuckets, LocalBuckets, PriorityRateLimiter, ProfileRateLimiter, TokenUsageCallback
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(LocalBuckets, "_clock", staticmethod(lambda: now[0]))
+    return now
+
+
+def wait_until(condition):
+    for _ in range(200):
+        if condition():
+            return
+        time.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+def test_buckets_refill_over_time(clock):
+    buckets = LocalBuckets(0, 60)
+
+    assert buckets.try_consume(60) == 0
+    assert buckets.try_consume(30) == pytest.approx(30.0)
+    clock[0] += 30
+    assert buckets.try_consume(30) == 0
+
+
+def test_reported_usage_below_the_estimate_is_refunded(clock):
+    buckets = LocalBuckets(0, 60)
+    buckets.try_consume(60)
+
+    buckets.adjust_tokens(-30)
+
+    assert buckets.try_consume(30) == 0
+
+
+def test_non_blocking_acquire_fails_on_an_empty_bucket(clock):
+    limiter = PriorityRateLimiter(LocalBuckets(0, 100))
+
+    assert limiter.acquire(1, 100, blocking=False)
+    assert not limiter.acquire(1, 100, blocking=False)
+    assert limiter.stats()["queue_depth"] == 0
+
+
+def test_waiting_calls_are_admitted_in_priority_order(clock):
+    limiter = PriorityRateLimiter(LocalBuckets(0, 100))
+    limiter.acquire(1, 100)
+    admitted = []
+
+    def call(name, priority):
+        limiter.acquire(priority, 100)
+        admitted.append(name)
+
+    batch = threading.Thread(target=call, args=("batch", 2))
+    batch.start()
+    wait_until(lambda: limiter.stats()["queue_depth"] == 1)
+    interactive = threading.Thread(target=call, args=("interactive", 0))
+    interactive.start()
+    wait_until(lambda: limiter.stats()["queue_depth"] == 2)
+    assert limiter.stats()["waiting_by_priority"] == {0: 1, 2: 1}
+
+    for expected in (1, 2):
+        with limiter._condition:
+            clock[0] += 60
+            limiter._condition.notify_all()
+        wait_until(lambda: len(admitted) == expected)
+    batch.join()
+    interactive.join()
+
+    assert admitted == ["interactive", "batch"]
+    assert limiter.stats()["acquired"] == 3
+
+
+def test_file_buckets_share_one_quota(tmp_path):
+    path = str(tmp_path / "limits.json")
+    first, second = FileBuckets(0, 100, path), FileBuckets(0, 100, path)
+
+    assert first.try_consume(100) == 0
+    assert second.try_consume(100) > 0
+
+
+def test_workers_yield_to_a_more_urgent_call_waiting_elsewhere(monkeypatch, tmp_path):
+    now = [1000.0]
+    monkeypatch.setattr(FileBuckets, "_clock", staticmethod(lambda: now[0]))
+    path = str(tmp_path / "limits.json")
+    interactive, batch = FileBuckets(0, 60, path), FileBuckets(0, 60, path)
+    assert batch.try_consume(60, priority=2) == 0
+
+    assert interactive.try_consume(60, priority=0) == pytest.approx(60.0)
+    now[0] += 60
+    # The batch worker polls first, but the interactive call has been waiting.
+    assert batch.try_consume(60, priority=2) == FileBuckets.YIELD_SECONDS
+    assert interactive.try_consume(60, priority=0) == 0
+    now[0] += 60
+    assert batch.try_consume(60, priority=2) == 0
+
+
+def test_waiting_entries_of_other_workers_expire_or_are_withdrawn(monkeypatch, tmp_path):
+    now = [1000.0]
+    monkeypatch.setattr(FileBuckets, "_clock", staticmethod(lambda: now[0]))
+    path = str(tmp_path / "limits.json")
+    interactive, batch = FileBuckets(0, 60, path), FileBuckets(0, 60, path)
+    batch.try_consume(60, priority=2)
+
+    interactive.try_consume(60, priority=0)
+    interactive.withdraw()
+    now[0] += 30
+    assert batch.try_consume(30, priority=2) == 0
+
+    interactive.try_consume(60, priority=0)
+    now[0] += 60 + FileBuckets.EXPIRY_GRACE_SECONDS
+    assert batch.try_consume(30, priority=2) == 0
+
+
+def test_chat_openai_calls_reserve_and_then_settle_reported_usage(clock):
+    requests_sent = []
+
+    def openai(request):
+        requests_sent.append(request)
+        return httpx.Response(200, json={
+            "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 50, "total_tokens": 150},
+        })
+
+    buckets = LocalBuckets(0, 10000)
+    limiter = PriorityRateLimiter(buckets)
+    llm = ChatOpenAI(model="gpt-4o-mini", api_key="test", max_retries=0,
+                     http_client=httpx.Client(transport=httpx.MockTransport(openai)),
+                     rate_limiter=ProfileRateLimiter(limiter, 1, 2000),
+                     callbacks=[TokenUsageCallback(limiter, 2000)])
+
+    assert llm.invoke("hola").content == "ok"
+
+    assert len(requests_sent) == 1
+    assert limiter.stats()["acquired"] == 1
+    # 2000 tokens were reserved before the call and 1850 refunded once OpenAI reported 150.
+    assert buckets.try_consume(9850) == 0
+    assert buckets.try_consume(1) > 0
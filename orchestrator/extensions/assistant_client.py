@@ -0,0 +1,159 @@
+import os
+import time
+from threading import Lock
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+API_PREFIX = "/api/v1/"
+
+# Overridable per endpoint with ASSISTANT_READ_TIMEOUT_<PATH>, e.g. ASSISTANT_READ_TIMEOUT_RAG_STREAM. For streams
+# this bounds the wait for each chunk, the first one included.
+ENDPOINT_READ_TIMEOUTS = {
+    "/api/v1/rag": 30,
+    "/api/v1/rag/batch": 600,
+    "/api/v1/rag/stream": 30,
+    "/api/v1/shopping-advisor": 60,
+    "/api/v1/shopping-advisor/stream": 60,
+    "/api/v1/analyze-pdf": 180,
+    "/api/v1/analyze-pdf/stream": 180,
+    "/api/v1/analyze-pdf/jobs": 30,
+}
+
+# Read-only endpoints that are safe to send again after a failed attempt. Batches and streams under them are not:
+# a retry would re-run the whole batch or replay a partly consumed stream.
+IDEMPOTENT_ENDPOINTS = ("/api/v1/rag", "/api/v1/shopping-advisor")
+
+
+def read_timeout_variable(path: str) -> str:
+    return f"ASSISTANT_READ_TIMEOUT_{path.removeprefix(API_PREFIX).replace('-', '_').replace('/', '_').upper()}"
+
+
+class CircuitOpenError(requests.ConnectionError):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial_in_flight or time.monotonic() - self._opened_at < self._reset_timeout:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self._failure_threshold:
+                self._opened_at = time.monotonic()
+
+    def release_trial(self):
+        """End a half-open trial that failed for a reason other than the assistant, leaving the circuit as it was."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if self._trial_in_flight else "open"
+
+
+class AssistantClient:
+    _session = None
+    _base_url = None
+    _breaker = None
+    _connect_timeout = None
+    _read_timeouts = {}
+
+    @classmethod
+    def init_app(cls):
+        if cls._session is not None:
+            return
+        cls._base_url = os.getenv("ASSISTANT_MICROSERVICE_URL")
+        # One connection per request thread, so a busy worker does not open and discard connections past the pool.
+        pool_size = int(os.getenv("ASSISTANT_HTTP_POOL_SIZE") or os.getenv("GUNICORN_THREADS") or 32)
+        cls._connect_timeout = float(os.getenv("ASSISTANT_CONNECT_TIMEOUT", "3.05"))
+        cls._read_timeouts = {path: float(os.getenv(read_timeout_variable(path), default))
+                              for path, default in ENDPOINT_READ_TIMEOUTS.items()}
+        cls._breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv("ASSISTANT_CIRCUIT_FAILURE_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("ASSISTANT_CIRCUIT_RESET_TIMEOUT", "30")),
+        )
+
+        session = requests.Session()
+        session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        if cls._base_url:
+            retry = Retry(
+                total=int(os.getenv("ASSISTANT_HTTP_RETRIES", "2")),
+                backoff_factor=float(os.getenv("ASSISTANT_HTTP_BACKOFF", "0.2")),
+                backoff_jitter=float(os.getenv("ASSISTANT_HTTP_BACKOFF_JITTER", "0.3")),
+                status_forcelist=(502, 503, 504),
+                allowed_methods=frozenset({"POST"}),
+                raise_on_status=False,
+            )
+            # Adapters are matched by longest URL prefix, so every other endpoint gets an explicit adapter without
+            # retries instead of inheriting one from an idempotent parent path.
+            for path in ENDPOINT_READ_TIMEOUTS:
+                max_retries = retry if path in IDEMPOTENT_ENDPOINTS else 0
+                session.mount(f"{cls._base_url}{path}",
+                              HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=max_retries))
+        cls._session = session
+
+    @classmethod
+    def post(cls, path: str, **kwargs) -> requests.Response:
+        return cls._request("POST", path, path, **kwargs)
+
+    @classmethod
+    def get(cls, path: str, timeout_path: str | None = None, **kwargs) -> requests.Response:
+        """`timeout_path` selects the read timeout for parameterised paths such as a job's status URL."""
+        return cls._request("GET", path, timeout_path or path, **kwargs)
+
+    @classmethod
+    def _request(cls, method: str, path: str, timeout_path: str, **kwargs) -> requests.Response:
+        if cls._session is None:
+            raise RuntimeError("Assistant client not initialized. Call init_app first.")
+        if not cls._base_url:
+            raise ValueError("ASSISTANT_MICROSERVICE_URL environment variable is not set")
+        if not cls._breaker.allow_request():
+            raise CircuitOpenError("Assistant microservice circuit is open")
+
+        timeout = (cls._connect_timeout, cls._read_timeouts.get(timeout_path, max(cls._read_timeouts.values())))
+        try:
+            response = cls._session.request(method, f"{cls._base_url}{path}", timeout=timeout, **kwargs)
+        except requests.RequestException:
+            cls._breaker.record_failure()
+            raise
+        except BaseException:
+            cls._breaker.release_trial()
+            raise
+        if response.status_code >= 500:
+            cls._breaker.record_failure()
+        else:
+            cls._breaker.record_success()
+        return response
+
+    @classmethod
+    def stats(cls) -> dict:
+        if cls._breaker is None:
+            return {"circuit": None}
+        return {"circuit": cls._breaker.state()}
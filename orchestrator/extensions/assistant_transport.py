@@ -0,0 +1,219 @@
+import importlib
+import os
+import sys
+from io import BytesIO
+
+import requests
+
+from extensions.assistant_client import AssistantClient
+from extensions.llm import LLM
+
+DEFAULT_ASSISTANT_PACKAGE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                              "..", "assistant")
+
+
+def load_assistant_package(assistant_path: str) -> str:
+    """Import the assistant tree as the package named after its directory and return that name, e.g. `assistant`.
+
+    The assistant imports its own modules relatively, so they live under that package and never collide with the
+    orchestrator's `extensions` or `services`.
+    """
+    assistant_path = os.path.abspath(assistant_path)
+    package = os.path.basename(assistant_path)
+    if not package.isidentifier():
+        raise ValueError(f"Cannot load the assistant from '{assistant_path}' as package '{package}'")
+    # On sys.path rather than registered by hand, so the spawned PDF extraction workers can import it too.
+    parent_path = os.path.dirname(assistant_path)
+    if parent_path not in sys.path:
+        sys.path.append(parent_path)
+    module_path = getattr(importlib.import_module(package), "__file__", None)
+    if module_path is None or os.path.dirname(os.path.abspath(module_path)) != assistant_path:
+        raise ValueError(f"Cannot load the assistant from '{assistant_path}': '{package}' resolves to {module_path}")
+    return package
+
+
+class AssistantBusyError(RuntimeError):
+    pass
+
+
+class HttpTransport:
+    """Calls the assistant microservice over HTTP."""
+
+    def chat_rag(self, question: str) -> str | None:
+        return self._answer(AssistantClient.post("/api/v1/rag", json={"question": question}))
+
+    def shopping_advisor(self, question: str) -> str | None:
+        return self._answer(AssistantClient.post("/api/v1/shopping-advisor", json={"question": question}))
+
+    def analyze_pdf(self, question: str, pdf_stream=None, filename: str | None = None, content_type: str | None = None,
+                    statement_id: str | None = None) -> dict | None:
+        response = AssistantClient.post("/api/v1/analyze-pdf",
+                                        **self._statement_request(question, pdf_stream, filename, content_type,
+                                                                  statement_id))
+        if response.status_code != 200:
+            return None
+        body = response.json()
+        return {"answer": body.get("response"), "statement_id": body.get("statement_id")}
+
+    def submit_analyze_pdf_job(self, question: str, pdf_stream=None, filename: str | None = None,
+                               content_type: str | None = None, statement_id: str | None = None) -> dict | None:
+        response = AssistantClient.post("/api/v1/analyze-pdf/jobs",
+                                        **self._statement_request(question, pdf_stream, filename, content_type,
+                                                                  statement_id))
+        if response.status_code == 429:
+            raise AssistantBusyError(response.json().get("message", "Assistant job queue is full"))
+        if response.status_code != 202:
+            return None
+        return response.json()
+
+    def get_analyze_pdf_job(self, job_id: str) -> dict | None:
+        response = AssistantClient.get(f"/api/v1/analyze-pdf/jobs/{job_id}", timeout_path="/api/v1/analyze-pdf/jobs")
+        if response.status_code != 200:
+            return None
+        return response.json()
+
+    def batch_chat_rag(self, questions: list[str], max_concurrency: int) -> list[dict]:
+        try:
+            response = AssistantClient.post("/api/v1/rag/batch",
+                                            json={"questions": questions, "max_concurrency": max_concurrency})
+        except requests.RequestException as error:
+            return [{"question": question, "error": str(error)} for question in questions]
+        if response.status_code != 200:
+            error = f"Assistant microservice returned {response.status_code}"
+            return [{"question": question, "error": error} for question in questions]
+        return response.json()["results"]
+
+    def stream_chat_rag(self, question: str):
+        return self._stream("/api/v1/rag/stream", json={"question": question})
+
+    def stream_shopping_advisor(self, question: str):
+        return self._stream("/api/v1/shopping-advisor/stream", json={"question": question})
+
+    def stream_analyze_pdf(self, question: str, pdf_stream=None, filename: str | None = None,
+                           content_type: str | None = None, statement_id: str | None = None):
+        return self._stream("/api/v1/analyze-pdf/stream",
+                            **self._statement_request(question, pdf_stream, filename, content_type, statement_id))
+
+    @staticmethod
+    def _statement_request(question: str, pdf_stream, filename: str | None, content_type: str | None,
+                           statement_id: str | None) -> dict:
+        if pdf_stream is None:
+            return {"data": {"question": question, "statement_id": statement_id}}
+        return {"files": {"pdf_file": (filename, pdf_stream, content_type)}, "data": {"question": question}}
+
+    @staticmethod
+    def _answer(response) -> str | None:
+        if response.status_code != 200:
+            return None
+        return response.json().get("response")
+
+    @staticmethod
+    def _stream(path: str, **kwargs):
+        response = AssistantClient.post(path, stream=True, **kwargs)
+        response.raise_for_status()
+        # The assistant already emits SSE frames, so they are relayed byte-for-byte as they arrive.
+        return response.iter_content(chunk_size=None)
+
+
+class InProcessTransport:
+    """Runs the assistant graphs inside the orchestrator process, for co-located deployments."""
+
+    def __init__(self, assistant_path: str):
+        package = load_assistant_package(assistant_path)
+
+        def assistant_module(name: str):
+            return importlib.import_module(f"{package}.{name}")
+
+        job_queue = assistant_module("extensions.job_queue")
+        statement_store = assistant_module("extensions.statement_store")
+        analyze_pdf_service = assistant_module("services.analyze_pdf_service")
+
+        self._stream_answer_events = assistant_module("services.streaming_service").stream_answer_events
+        self._statement_not_found_error = statement_store.StatementNotFoundError
+        self._job_queue = job_queue.JobQueue
+        self._job_queue_full_error = job_queue.JobQueueFullError
+        self._run_analysis_job = analyze_pdf_service.run_analysis_job
+
+        # The assistant's LLM extension is a separate module here; it draws from the orchestrator's OpenAI quota.
+        assistant_module("extensions.llm").LLM.init_app(rate_limiter=LLM.get_rate_limiter())
+        statement_store.StatementStore.init_app()
+        job_queue.JobQueue.init_app()
+        assistant_module("extensions.tavily_tool").Tavily.init_app()
+        assistant_module("extensions.vector_store").VectorStore.init_app()
+        self._chat_rag_graph = assistant_module("services.chat_rag_service").build_chat_rag_graph()
+        shopping_advisor_service = assistant_module("services.shopping_advisor_service")
+        self._shopping_advisor_graph = shopping_advisor_service.build_shopping_advisor_graph()
+        self._pdf_analyzer_graph = analyze_pdf_service.build_pdf_analyzer_graph()
+
+    def chat_rag(self, question: str) -> str | None:
+        return self._chat_rag_graph.invoke({"question": question})["answer"]
+
+    def shopping_advisor(self, question: str) -> str | None:
+        return self._shopping_advisor_graph.invoke({"question": question})["answer"]
+
+    def analyze_pdf(self, question: str, pdf_stream=None, filename: str | None = None, content_type: str | None = None,
+                    statement_id: str | None = None) -> dict | None:
+        try:
+            response = self._pdf_analyzer_graph.invoke({"pdf_stream": pdf_stream, "statement_id": statement_id,
+                                                        "question": question})
+        except self._statement_not_found_error:
+            return None
+        return {"answer": response["answer"], "statement_id": response["statement_id"]}
+
+    def submit_analyze_pdf_job(self, question: str, pdf_stream=None, filename: str | None = None,
+                               content_type: str | None = None, statement_id: str | None = None) -> dict | None:
+        if pdf_stream is not None:
+            # The request's upload is closed when the request ends, before the job runs.
+            pdf_stream = BytesIO(pdf_stream.read())
+        try:
+            job_id = self._job_queue.submit(self._run_analysis_job, self._pdf_analyzer_graph, pdf_stream,
+                                            statement_id, question)
+        except self._job_queue_full_error as error:
+            raise AssistantBusyError(str(error)) from error
+        return {"job_id": job_id, "status": "queued"}
+
+    def get_analyze_pdf_job(self, job_id: str) -> dict | None:
+        return self._job_queue.get(job_id)
+
+    def batch_chat_rag(self, questions: list[str], max_concurrency: int) -> list[dict]:
+        responses = self._chat_rag_graph.batch([{"question": question} for question in questions],
+                                               config={"max_concurrency": max_concurrency}, return_exceptions=True)
+        return [
+            {"question": question, "error": str(response)} if isinstance(response, Exception)
+            else {"question": question, "response": response["answer"]}
+            for question, response in zip(questions, responses)
+        ]
+
+    def stream_chat_rag(self, question: str):
+        return self._stream_answer_events(self._chat_rag_graph, {"question": question}, "generate")
+
+    def stream_shopping_advisor(self, question: str):
+        return self._stream_answer_events(self._shopping_advisor_graph, {"question": question}, "analyze_results")
+
+    def stream_analyze_pdf(self, question: str, pdf_stream=None, filename: str | None = None,
+                           content_type: str | None = None, statement_id: str | None = None):
+        inputs = {"pdf_stream": pdf_stream, "statement_id": statement_id, "question": question}
+        return self._stream_answer_events(self._pdf_analyzer_graph, inputs, "analyze_bank_statement")
+
+
+class AssistantTransport:
+    _transport = None
+
+    @classmethod
+    def init_app(cls):
+        if cls._transport is not None:
+            return
+        mode = os.getenv("ASSISTANT_TRANSPORT", "http")
+        if mode == "http":
+            AssistantClient.init_app()
+            cls._transport = HttpTransport()
+        elif mode == "inprocess":
+            cls._transport = InProcessTransport(os.getenv("ASSISTANT_PACKAGE_PATH", DEFAULT_ASSISTANT_PACKAGE_PATH))
+        else:
+            raise ValueError(f"Unknown assistant transport '{mode}', expected 'http' or 'inprocess'")
+
+    @classmethod
+    def get_transport(cls):
+        if cls._transport is None:
+            raise RuntimeError("Assistant transport not initialized. Call init_app first.")
+        return cls._transport
@@ -0,0 +1,96 @@
+import json
+import math
+import os
+import re
+import unicodedata
+from collections import Counter
+
+DEFAULT_EXAMPLES_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config",
+                                     "fast_classifier_examples.json")
+
+# Labels the local model may decide on its own. A character n-gram model cannot tell "save on taxes" from "evade
+# taxes", so it may only block guardrail input; letting a request through is always left to the LLM.
+LOCAL_LABELS = {"guardrail": ("STOP",)}
+
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+def char_ngrams(text: str, sizes=(3, 4, 5)) -> Counter:
+    padded = f" {text} "
+    return Counter(padded[i:i + size] for size in sizes for i in range(len(padded) - size + 1))
+
+
+def _unit(vector: dict) -> dict:
+    norm = math.sqrt(sum(value * value for value in vector.values()))
+    if norm == 0:
+        return {}
+    return {key: value / norm for key, value in vector.items()}
+
+
+class CentroidClassifier:
+    """Nearest-centroid classifier over TF-IDF weighted character n-grams."""
+
+    def __init__(self, examples: dict[str, list[str]], temperature: float = 0.05):
+        documents = [(label, char_ngrams(normalize_text(text))) for label, texts in examples.items() for text in texts]
+        document_frequency = Counter(gram for _, grams in documents for gram in grams)
+        self._idf = {gram: math.log((1 + len(documents)) / (1 + count)) + 1
+                     for gram, count in document_frequency.items()}
+        self._temperature = temperature
+        self._centroids = {}
+        for label in examples:
+            centroid = Counter()
+            for document_label, grams in documents:
+                if document_label == label:
+                    centroid.update(self._vectorize(grams))
+            self._centroids[label] = _unit(centroid)
+
+    def _vectorize(self, grams: Counter) -> dict:
+        return _unit({gram: (1 + math.log(count)) * self._idf[gram] for gram, count in grams.items()
+                      if gram in self._idf})
+
+    def predict(self, text: str) -> tuple[str, float, float]:
+        """Return the best label, its softmax confidence and its cosine similarity."""
+        vector = self._vectorize(char_ngrams(normalize_text(text)))
+        scores = {label: sum(weight * centroid.get(gram, 0.0) for gram, weight in vector.items())
+                  for label, centroid in self._centroids.items()}
+        best_label = max(scores, key=scores.get)
+        exponents = {label: math.exp((score - scores[best_label]) / self._temperature)
+                     for label, score in scores.items()}
+        confidence = exponents[best_label] / sum(exponents.values())
+        return best_label, confidence, scores[best_label]
+
+
+class FastClassifier:
+    _models = None
+    _threshold = 0.9
+    _min_similarity = 0.2
+
+    @classmethod
+    def init_app(cls, examples_path: str | None = None):
+        if cls._models is not None:
+            return
+        if os.getenv("FAST_CLASSIFIER_ENABLED", "false").lower() != "true":
+            return
+        path = examples_path or os.getenv("FAST_CLASSIFIER_EXAMPLES", DEFAULT_EXAMPLES_PATH)
+        with open(path, encoding="utf-8") as examples_file:
+            examples = json.load(examples_file)
+        cls._threshold = float(os.getenv("FAST_CLASSIFIER_THRESHOLD", "0.9"))
+        cls._min_similarity = float(os.getenv("FAST_CLASSIFIER_MIN_SIMILARITY", "0.2"))
+        cls._models = {task: CentroidClassifier(labels) for task, labels in examples.items()}
+
+    @classmethod
+    def classify(cls, task: str, text: str) -> str | None:
+        """Return a label when the local model is confident enough, otherwise None to fall back to the LLM."""
+        if cls._models is None or task not in cls._models:
+            return None
+        label, confidence, similarity = cls._models[task].predict(text)
+        if confidence < cls._threshold or similarity < cls._min_similarity:
+            return None
+        if task in LOCAL_LABELS and label not in LOCAL_LABELS[task]:
+            return None
+        return label
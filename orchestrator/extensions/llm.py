@@ -1,16 +1,29 @@
-from langchain_openai import ChatOpenAI
+from common.llm import ProfiledLLM
 
+# Named settings nodes ask for with LLM.get_llm(profile). Any field can be overridden per profile with
+# LLM_<PROFILE>_MODEL, LLM_<PROFILE>_MAX_TOKENS, LLM_<PROFILE>_TIMEOUT and LLM_<PROFILE>_MAX_RETRIES.
+LLM_PROFILES = {
+    "default": {"model": "gpt-4o-mini", "max_tokens": None, "timeout": 60, "max_retries": 2, "stop": None},
+    # One-word labels such as CONTINUE/STOP or an intention name.
+    "classifier": {"model": "gpt-4o-mini", "max_tokens": 8, "timeout": 10, "max_retries": 1, "stop": ["\n"]},
+    # The same labels for offline batches, which queue behind interactive traffic.
+    "batch_classifier": {"model": "gpt-4o-mini", "max_tokens": 8, "timeout": 30, "max_retries": 2, "stop": ["\n"]},
+    # Small JSON objects produced through with_structured_output.
+    "structured_classifier": {"model": "gpt-4o-mini", "max_tokens": 64, "timeout": 10, "max_retries": 1,
+                              "stop": None},
+}
 
-class LLM:
-    _llm_instance = None
+# (priority, expected tokens per call) used by the shared rate limiter: lower priorities are admitted first, and the
+# expected tokens are reserved up front and then corrected with the usage OpenAI reports. The assistant's generation
+# profiles use priorities 1 and 2.
+RATE_LIMIT_PROFILES = {
+    "default": (1, 2000),
+    "classifier": (0, 800),
+    "batch_classifier": (2, 800),
+    "structured_classifier": (0, 900),
+}
 
-    @classmethod
-    def init_app(cls):
-        if cls._llm_instance is None:
-            cls._llm_instance = ChatOpenAI(model="gpt-4o-mini", temperature=0)
 
-    @classmethod
-    def get_llm(cls):
-        if cls._llm_instance is None:
-            raise RuntimeError("Database not initialized. Call init_app first")
-        return cls._llm_instance
+class LLM(ProfiledLLM):
+    PROFILES = LLM_PROFILES
+    RATE_LIMITS = RATE_LIMIT_PROFILES
@@ -0,0 +1,56 @@
+import os
+
+from common.cache import TTLCache
+from extensions.fast_classifier import normalize_text
+
+DEFAULT_ANSWER_TTLS = {"chat_qna": 86400, "shop_advisor": 900, "statement_analysis": 0}
+
+
+class ResponseCache:
+    _answers = None
+    _classifications = None
+    _answer_ttls = {}
+    _classification_ttl = 0
+
+    @classmethod
+    def init_app(cls):
+        if cls._answers is not None:
+            return
+        if os.getenv("ORCHESTRATOR_CACHE_ENABLED", "true").lower() != "true":
+            return
+        max_entries = int(os.getenv("ORCHESTRATOR_CACHE_MAX_ENTRIES", "10000"))
+        cls._answers = TTLCache(max_entries)
+        cls._classifications = TTLCache(max_entries)
+        cls._answer_ttls = {
+            intention: float(os.getenv(f"ORCHESTRATOR_CACHE_TTL_{intention.upper()}", default))
+            for intention, default in DEFAULT_ANSWER_TTLS.items()
+        }
+        cls._classification_ttl = float(os.getenv("ORCHESTRATOR_CACHE_TTL_CLASSIFICATION", "86400"))
+
+    @classmethod
+    def get_classification(cls, question: str, has_pdf: bool) -> dict | None:
+        if cls._classifications is None:
+            return None
+        return cls._classifications.get((normalize_text(question), has_pdf))
+
+    @classmethod
+    def set_classification(cls, question: str, has_pdf: bool, classification: dict):
+        if cls._classifications is not None:
+            cls._classifications.set((normalize_text(question), has_pdf), classification, cls._classification_ttl)
+
+    @classmethod
+    def get_answer(cls, question: str, intention: str) -> str | None:
+        if cls._answers is None:
+            return None
+        return cls._answers.get((normalize_text(question), intention))
+
+    @classmethod
+    def set_answer(cls, question: str, intention: str, answer: str):
+        if cls._answers is not None:
+            cls._answers.set((normalize_text(question), intention), answer, cls._answer_ttls.get(intention, 0))
+
+    @classmethod
+    def stats(cls) -> dict:
+        if cls._answers is None:
+            return {"enabled": False}
+        return {"enabled": True, "answers": cls._answers.stats(), "classifications": cls._classifications.stats()}
@@ -0,0 +1,85 @@
+import os
+from threading import Event, Lock
+
+
+class CoalescingTimeoutError(TimeoutError):
+    pass
+
+
+class _Call:
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs a function once per key while it is in flight; concurrent callers wait for and share the outcome."""
+
+    def __init__(self, max_wait: float | None):
+        self._max_wait = max_wait
+        self._calls = {}
+        self._lock = Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if not call.done.wait(self._max_wait):
+                raise CoalescingTimeoutError(f"Timed out after {self._max_wait}s waiting for an in-flight request")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": len(self._calls), "executed": self.executed, "coalesced": self.coalesced}
+
+
+class RequestCoalescer:
+    _groups = None
+    _max_wait = None
+
+    @classmethod
+    def init_app(cls):
+        if cls._groups is not None:
+            return
+        if os.getenv("ORCHESTRATOR_COALESCING_ENABLED", "true").lower() != "true":
+            return
+        cls._max_wait = float(os.getenv("ORCHESTRATOR_COALESCING_MAX_WAIT", "60"))
+        cls._groups = {}
+
+    @classmethod
+    def do(cls, group: str, key, fn):
+        if cls._groups is None:
+            return fn()
+        single_flight = cls._groups.get(group)
+        if single_flight is None:
+            single_flight = cls._groups.setdefault(group, SingleFlight(cls._max_wait))
+        return single_flight.do(key, fn)
+
+    @classmethod
+    def stats(cls) -> dict:
+        if cls._groups is None:
+            return {"enabled": False}
+        return {"enabled": True, **{group: single_flight.stats() for group, single_flight in cls._groups.items()}}
@@ -0,0 +1,24 @@
+import math
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+# One worker per core: requests mostly wait on OpenAI, Tavily or Mongo, so threads carry the concurrency, and every
+# extra worker duplicates its graphs, clients and executors. The threads are sized so the instance holds
+# GUNICORN_MAX_IN_FLIGHT requests at once whatever its core count.
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+threads = int(os.getenv("GUNICORN_THREADS") or math.ceil(int(os.getenv("GUNICORN_MAX_IN_FLIGHT", "256")) / workers))
+# Read back by the workers to size their connection pool to the assistant.
+os.environ["GUNICORN_THREADS"] = str(threads)
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "300"))
+graceful_timeout = 30
+keepalive = 5
+# The repository root, for the shared `common` package when running from a checkout; images copy it next to the app.
+pythonpath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each worker imports the app itself so graphs, LLM and database clients are built once per worker
+# after the fork instead of being shared across processes.
+preload_app = False
+
+worker_class = "gthread"
+wsgi_app = "orchestrator:app"
@@ -2,7 +2,11 @@ from flask import Flask
 from flask_smorest import Api
 
 from config.config import Config
+from extensions.assistant_transport import AssistantTransport
+from extensions.fast_classifier import FastClassifier
 from extensions.llm import LLM
+from extensions.response_cache import ResponseCache
+from extensions.single_flight import RequestCoalescer
 from resources.v1.endpoints.orchestrate import blp as orchestrator_blueprint
 
 app = Flask(__name__)
@@ -12,5 +16,9 @@ app.config.from_object(Config)
 api = Api(app)
 
 LLM.init_app()
+AssistantTransport.init_app()
+FastClassifier.init_app()
+ResponseCache.init_app()
+RequestCoalescer.init_app()
 
 api.register_blueprint(orchestrator_blueprint, url_prefix="/api/v1")
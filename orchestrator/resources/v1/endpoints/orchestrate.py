@@ -1,10 +1,19 @@
 from typing import TypedDict
 
+import requests
+from flask import Response, stream_with_context
 from flask.views import MethodView
-from flask_smorest import Blueprint
+from flask_smorest import Blueprint, abort
 
-from schemas import OrchestratorSchema
-from services.orchestrator_service import build_orchestrator_graph
+from extensions.assistant_client import AssistantClient
+from extensions.assistant_transport import AssistantBusyError, AssistantTransport
+from extensions.llm import LLM
+from extensions.response_cache import ResponseCache
+from extensions.single_flight import CoalescingTimeoutError, RequestCoalescer
+from schemas import BatchSchema, JobSchema, OrchestratorSchema
+from services.batch_orchestrator_service import batch_orchestrate
+from services.orchestrator_service import (SpeculationStats, build_orchestrator_graph, invoke_orchestrator,
+                                          stream_orchestrator)
 
 
 class State(TypedDict):
@@ -17,6 +26,7 @@ class State(TypedDict):
 blp = Blueprint("Orchestrator", __name__, description="Orchestrator V1")
 
 graph = build_orchestrator_graph()
+classification_graph = build_orchestrator_graph(dispatch=False)
 
 
 @blp.route("/orchestrate")
@@ -25,5 +35,59 @@ class ChatRag(MethodView):
     @blp.arguments(OrchestratorSchema, location="form")
     @blp.response(200, OrchestratorSchema)
     def post(self, request_data):
-        response = graph.invoke({"question": request_data["question"]})
-        return {"response": response["answer"], "question": request_data["question"]}
+        try:
+            result = invoke_orchestrator(graph, request_data["question"])
+        except CoalescingTimeoutError as error:
+            abort(504, message=str(error))
+        except AssistantBusyError as error:
+            abort(429, message=str(error), headers={"Retry-After": "30"})
+        return {"response": result["answer"], "question": request_data["question"],
+                "statement_id": result.get("statement_id"), "job_id": result.get("job_id")}
+
+
+@blp.route("/orchestrate/jobs/<string:job_id>")
+class OrchestratorJob(MethodView):
+
+    @blp.response(200, JobSchema)
+    def get(self, job_id):
+        try:
+            job = AssistantTransport.get_transport().get_analyze_pdf_job(job_id)
+        except requests.RequestException as error:
+            abort(502, message=str(error))
+        if job is None:
+            abort(404, message=f"Job '{job_id}' is unknown or has expired")
+        return job
+
+
+@blp.route("/orchestrate/batch")
+class OrchestratorBatch(MethodView):
+
+    @blp.arguments(BatchSchema)
+    @blp.response(200, BatchSchema)
+    def post(self, request_data):
+        return {"results": batch_orchestrate(request_data["questions"])}
+
+
+@blp.route("/orchestrate/stream")
+class OrchestratorStream(MethodView):
+
+    @blp.arguments(OrchestratorSchema, location="form")
+    def post(self, request_data):
+        return Response(
+            stream_with_context(stream_orchestrator(classification_graph, request_data["question"])),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+
+@blp.route("/orchestrate/stats")
+class OrchestratorStats(MethodView):
+
+    def get(self):
+        return {
+            "speculative_dispatch": SpeculationStats.snapshot(),
+            "response_cache": ResponseCache.stats(),
+            "coalescing": RequestCoalescer.stats(),
+            "assistant_client": AssistantClient.stats(),
+            "openai_rate_limiter": LLM.stats(),
+        }
@@ -1,6 +1,27 @@
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, validate
 
 
 class OrchestratorSchema(Schema):
     question = fields.Str(required=True)
+    statement_id = fields.Str()
+    asynchronous = fields.Bool(load_only=True)
     response = fields.Str(dump_only=True)
+    job_id = fields.Str(dump_only=True)
+
+
+class JobSchema(Schema):
+    job_id = fields.Str(dump_only=True)
+    status = fields.Str(dump_only=True)
+    result = fields.Dict(dump_only=True)
+    error = fields.Str(dump_only=True)
+
+
+class BatchItemSchema(Schema):
+    question = fields.Str()
+    response = fields.Str()
+    error = fields.Str()
+
+
+class BatchSchema(Schema):
+    questions = fields.List(fields.Str(), required=True, load_only=True, validate=validate.Length(min=1, max=1000))
+    results = fields.List(fields.Nested(BatchItemSchema), dump_only=True)
@@ -0,0 +1,102 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from extensions.assistant_transport import AssistantTransport
+from extensions.fast_classifier import FastClassifier
+from extensions.llm import LLM
+from extensions.response_cache import ResponseCache
+from langchain_core.prompts import ChatPromptTemplate
+from services.orchestrator_service import (DEFAULT_RESPONSE, GUARDRAIL_PROMPT, INTENTION_PROMPT,
+                                          REJECTION_RESPONSE, canonical_intention)
+
+
+def batch_llm_labels(system_prompt: str, questions: list[str], max_concurrency: int) -> list:
+    if not questions:
+        return []
+    llm = LLM.get_llm("batch_classifier")
+    chat_template = ChatPromptTemplate([("system", system_prompt), ("user", "{question}")])
+    messages = [chat_template.invoke({"question": question}) for question in questions]
+    responses = llm.batch(messages, config={"max_concurrency": max_concurrency}, return_exceptions=True)
+    return [response if isinstance(response, Exception) else response.content for response in responses]
+
+
+def classify_batch(questions: list[str], labels: list, task: str, system_prompt: str, max_concurrency: int) -> list:
+    """Fill the missing labels locally when possible and send the rest to the LLM in a single batch."""
+    labels = [label or FastClassifier.classify(task, question) for question, label in zip(questions, labels)]
+    pending = [index for index, label in enumerate(labels) if label is None]
+    llm_labels = batch_llm_labels(system_prompt, [questions[index] for index in pending], max_concurrency)
+    for index, label in zip(pending, llm_labels):
+        labels[index] = label
+    return labels
+
+
+def batch_shopping_advisor(questions: list[str], max_concurrency: int) -> list[dict]:
+    """Ask the assistant for each question concurrently, turning failures into per-item errors."""
+    transport = AssistantTransport.get_transport()
+
+    def advise(question: str) -> dict:
+        try:
+            answer = transport.shopping_advisor(question)
+        except Exception as error:
+            return {"question": question, "error": str(error)}
+        if answer is None:
+            return {"question": question, "error": "Assistant microservice returned no answer"}
+        return {"question": question, "response": answer}
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        return list(executor.map(advise, questions))
+
+
+def batch_orchestrate(questions: list[str], max_concurrency: int | None = None) -> list[dict]:
+    max_concurrency = max_concurrency or int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+    results = [None] * len(questions)
+    cached = [ResponseCache.get_classification(question, False) or {} for question in questions]
+
+    guardrail = classify_batch(questions, [classification.get("guardrail_status") for classification in cached],
+                               "guardrail", GUARDRAIL_PROMPT, max_concurrency)
+    allowed = []
+    for index, (question, status) in enumerate(zip(questions, guardrail)):
+        if isinstance(status, Exception):
+            results[index] = {"question": question, "error": str(status)}
+        elif "CONTINUE" in status:
+            allowed.append(index)
+        else:
+            ResponseCache.set_classification(question, False, {"guardrail_status": status})
+            results[index] = {"question": question, "response": REJECTION_RESPONSE}
+
+    intentions = classify_batch([questions[index] for index in allowed],
+                                [cached[index].get("intention") for index in allowed],
+                                "intention", INTENTION_PROMPT, max_concurrency)
+    groups = {}
+    for index, intention in zip(allowed, intentions):
+        question = questions[index]
+        if isinstance(intention, Exception):
+            results[index] = {"question": question, "error": str(intention)}
+            continue
+        ResponseCache.set_classification(question, False,
+                                         {"guardrail_status": guardrail[index], "intention": intention})
+        intention = canonical_intention(intention)
+        answer = ResponseCache.get_answer(question, intention) if intention else None
+        if answer is not None:
+            results[index] = {"question": question, "response": answer}
+        else:
+            groups.setdefault(intention, []).append(index)
+
+    for intention, indexes in groups.items():
+        group_questions = [questions[index] for index in indexes]
+        if intention == "chat_qna":
+            group_results = AssistantTransport.get_transport().batch_chat_rag(group_questions, max_concurrency)
+        elif intention == "shop_advisor":
+            group_results = batch_shopping_advisor(group_questions, max_concurrency)
+        elif intention == "statement_analysis":
+            group_results = [{"question": question, "error": "Bank statement analysis requires a pdf_file and is "
+                                                             "not available in batch mode"}
+                             for question in group_questions]
+        else:
+            group_results = [{"question": question, "response": DEFAULT_RESPONSE} for question in group_questions]
+
+        for index, result in zip(indexes, group_results):
+            if intention and result.get("response") and result["response"] != DEFAULT_RESPONSE:
+                ResponseCache.set_answer(questions[index], intention, result["response"])
+            results[index] = result
+    return results
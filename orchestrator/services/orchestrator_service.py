@@ -1,29 +1,51 @@
 import os
-from typing import TypedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+from typing import Iterator, Literal, TypedDict
 
 import requests
+from common.sse import format_sse
+from extensions.assistant_transport import AssistantTransport
+from extensions.fast_classifier import FastClassifier, normalize_text
 from extensions.llm import LLM
-from flask import request
+from extensions.response_cache import ResponseCache
+from extensions.single_flight import RequestCoalescer
+from flask import has_request_context, request
 from langchain_core.prompts import ChatPromptTemplate
+from langgraph.constants import START
 from langgraph.graph import StateGraph
 from langgraph.graph.state import CompiledStateGraph
+from pydantic import BaseModel, Field
 
 
 DEFAULT_RESPONSE = "Respuesta no permitida."
 
+JOB_ACCEPTED_RESPONSE = "Estamos analizando su extracto bancario. Consulte el resultado con el job_id indicado."
 
-class OrchestratorState(TypedDict):
-    intention: str
-    question: str
-    guardrail_status: str
-    answer: str
+REJECTION_RESPONSE = """
+    Agradecemos su consulta. Lamentablemente, en este momento no podemos proporcionarle una respuesta debido a una de las siguientes razones:
+1. La información solicitada no está disponible en nuestra base de datos.
+2. La consulta involucra temas que no están relacionados con asesoramiento financiero.
+3. La solicitud podría implicar información restringida o no permitida por normativas legales.
+Si su consulta está dentro del ámbito financiero, le sugerimos reformularla para que podamos asistirle de la mejor manera posible. Para temas específicos o complejos, le recomendamos contactar con un profesional autorizado en la materia.
+    """
 
+CLASSIFICATION_MODES = ("sequential", "combined", "parallel")
 
-def guardrail_topic(state: OrchestratorState):
-    llm = LLM.get_llm()
-    chat_template = ChatPromptTemplate(
-        [("system",
-          """
+INTENTIONS = ("chat_qna", "statement_analysis", "shop_advisor")
+
+SPECULATIVE_INTENTIONS = tuple(
+    intention.strip()
+    for intention in os.getenv("ORCHESTRATOR_SPECULATIVE_INTENTIONS", "chat_qna,shop_advisor").split(",")
+    if intention.strip()
+)
+
+_speculative_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("ORCHESTRATOR_SPECULATIVE_WORKERS", "8")),
+    thread_name_prefix="speculative-dispatch",
+)
+
+GUARDRAIL_PROMPT = """
           Evaluate the user input to determine if it adheres to the allowed topics and conditions. The user input should only pertain to financial education questions, bank statement analysis, or product recommendations. Ensure compliance with privacy and legality constraints.
 
 - **Allowed Topics**:
@@ -77,27 +99,9 @@ _Output_: STOP
 
 - Always err on the side of caution; if in doubt about the content, opt for "STOP."
 - Consider any ambiguous requests or requests with implied sensitive or illegal content as non-compliant.
-        """),
-         ("user", "{question}")]
-    )
-    messages = chat_template.invoke({"question": state["question"]})
-    response = llm.invoke(messages)
-    state["guardrail_status"] = response.content
-    return state
-
+"""
 
-def route_guardrail(state: OrchestratorState):
-    if "CONTINUE" in state["guardrail_status"]:
-        return "intention_node"
-    else:
-        return "default_response"
-
-
-def intention_node(state: OrchestratorState):
-    llm = LLM.get_llm()
-    chat_template = ChatPromptTemplate([
-        ("system",
-         """
+INTENTION_PROMPT = """
          Classify the user's input into one of three defined intentions based on the content provided. The possible intentions are: "Financial Education Q&A," "Bank Statement Analysis," and "Shopping Advisor."
 
 - "Financial Education Q&A": If the input includes a financial education question.
@@ -140,68 +144,352 @@ Respond with one of the following terms, based on the detected intention:
 
 - Ensure to only use the specified output terms.
 - The classifications should be mutually exclusive and comprehensive. Always choose the most fitting label for each input.
-         """),
-        ("user", "{question}")
-    ])
-    messages = chat_template.invoke({"question": state["question"]})
-    response = llm.invoke(messages)
-    state["intention"] = response.content
-    return state
+"""
+
+CLASSIFICATION_PROMPT = f"""
+Perform two independent classifications of the same user input and return both results.
+
+## Guardrail
+
+{GUARDRAIL_PROMPT}
+
+## Intention
+
+{INTENTION_PROMPT}
+
+Always return an intention, even when the guardrail status is "STOP".
+"""
+
+
+class OrchestratorState(TypedDict):
+    intention: str
+    question: str
+    guardrail_status: str
+    answer: str
+    statement_id: str
+    job_id: str
+    speculative_call: Future
+
+
+class SpeculationStats:
+    _lock = Lock()
+    _counters = {"dispatched": 0, "used": 0, "cancelled": 0, "wasted": 0}
+
+    @classmethod
+    def increment(cls, counter: str):
+        with cls._lock:
+            cls._counters[counter] += 1
+
+    @classmethod
+    def snapshot(cls) -> dict:
+        with cls._lock:
+            return dict(cls._counters)
+
+
+class Classification(BaseModel):
+    guardrail_status: Literal["CONTINUE", "STOP"] = Field(
+        description="CONTINUE if the input complies with the allowed topics and constraints, STOP otherwise."
+    )
+    intention: Literal["chat_qna", "statement_analysis", "shop_advisor"] = Field(
+        description="The intention that best fits the user input."
+    )
+
+
+def has_pdf_attachment() -> bool:
+    """True when the request carries a statement, either as an uploaded pdf_file or as a statement_id."""
+    return has_request_context() and (request.files.get("pdf_file") is not None
+                                      or bool(request.form.get("statement_id")))
+
+
+def statement_context(intention: str) -> tuple:
+    if "statement_analysis" not in intention:
+        return None, None
+    return request.files.get("pdf_file"), request.form.get("statement_id")
+
+
+def asynchronous_requested() -> bool:
+    return request.form.get("asynchronous", "").lower() in ("true", "1")
+
+
+def local_intention(question: str) -> str | None:
+    if has_pdf_attachment():
+        return "statement_analysis"
+    return FastClassifier.classify("intention", question)
+
+
+def invoke_llm(node: str, question: str, llm, messages):
+    return RequestCoalescer.do(node, normalize_text(question), lambda: llm.invoke(messages))
+
+
+def guardrail_topic(state: OrchestratorState):
+    if state.get("guardrail_status"):
+        return {}
+    guardrail_status = FastClassifier.classify("guardrail", state["question"])
+    if guardrail_status is None:
+        llm = LLM.get_llm("classifier")
+        chat_template = ChatPromptTemplate([("system", GUARDRAIL_PROMPT), ("user", "{question}")])
+        messages = chat_template.invoke({"question": state["question"]})
+        guardrail_status = invoke_llm("guardrail_topic", state["question"], llm, messages).content
+    return {"guardrail_status": guardrail_status}
+
+
+def route_guardrail(state: OrchestratorState):
+    if "CONTINUE" in state["guardrail_status"]:
+        return "continue"
+    else:
+        return "default_response"
+
+
+def intention_node(state: OrchestratorState):
+    if state.get("intention"):
+        return {}
+    intention = local_intention(state["question"])
+    if intention is None:
+        llm = LLM.get_llm("classifier")
+        chat_template = ChatPromptTemplate([("system", INTENTION_PROMPT), ("user", "{question}")])
+        messages = chat_template.invoke({"question": state["question"]})
+        intention = invoke_llm("intention_node", state["question"], llm, messages).content
+    return {"intention": intention}
+
+
+def classify_node(state: OrchestratorState):
+    guardrail_status = state.get("guardrail_status") or FastClassifier.classify("guardrail", state["question"])
+    intention = state.get("intention") or local_intention(state["question"])
+    if guardrail_status is None or intention is None:
+        llm = LLM.get_llm("structured_classifier").with_structured_output(Classification)
+        chat_template = ChatPromptTemplate([("system", CLASSIFICATION_PROMPT), ("user", "{question}")])
+        messages = chat_template.invoke({"question": state["question"]})
+        classification = invoke_llm("classify_node", state["question"], llm, messages)
+        guardrail_status = guardrail_status or classification.guardrail_status
+        intention = intention or classification.intention
+    return {"guardrail_status": guardrail_status, "intention": intention}
+
+
+def join_classification(state: OrchestratorState):
+    return {}
+
+
+def skip_dispatch(state: OrchestratorState):
+    return {}
 
 
 def default_response(state: OrchestratorState) -> OrchestratorState:
-    state["answer"] = """
-    Agradecemos su consulta. Lamentablemente, en este momento no podemos proporcionarle una respuesta debido a una de las siguientes razones:
-1. La información solicitada no está disponible en nuestra base de datos.
-2. La consulta involucra temas que no están relacionados con asesoramiento financiero.
-3. La solicitud podría implicar información restringida o no permitida por normativas legales.
-Si su consulta está dentro del ámbito financiero, le sugerimos reformularla para que podamos asistirle de la mejor manera posible. Para temas específicos o complejos, le recomendamos contactar con un profesional autorizado en la materia.
-    """
+    discard_speculative_call(state)
+    state["answer"] = REJECTION_RESPONSE
     return state
 
 
-def route_intention(state: OrchestratorState):
-    base_url = os.getenv("ASSISTANT_MICROSERVICE_URL")
-    if not base_url:
-        raise ValueError("ASSISTANT_MICROSERVICE_URL environment variable is not set")
-
-    if "chat_qna" in state["intention"]:
-        response = requests.post(f"{base_url}/api/v1/rag", json={"question": state["question"]})
-    elif "statement_analysis" in state["intention"]:
-        uploaded_pdf = request.files.get("pdf_file")
-        if not uploaded_pdf:
-            state["answer"] = "No hay PDF bro"
-        uploaded_pdf.stream.seek(0)
-        files = {
-            "pdf_file": (uploaded_pdf.filename, uploaded_pdf.stream, uploaded_pdf.content_type)
-        }
-        response = requests.post(f"{base_url}/api/v1/analyze-pdf", files=files,
-                                 data={"question": state["question"]})
-    elif "shop_advisor" in state["intention"]:
-        response = requests.post(f"{base_url}/api/v1/shopping-advisor", json={"question": state["question"]})
-    else:
-        state["answer"] = DEFAULT_RESPONSE
-        return state
+def call_assistant(intention: str, question: str, uploaded_pdf=None, statement_id: str | None = None,
+                   asynchronous: bool = False) -> dict:
+    """Return the state update for the assistant's answer, plus the statement_id for statement analyses.
 
-    if response.status_code == 200:
-        state["answer"] = response.json().get("response", DEFAULT_RESPONSE)
+    With `asynchronous`, statement analyses are queued as assistant jobs and the update carries the job_id instead.
+    """
+    transport = AssistantTransport.get_transport()
+    try:
+        if "chat_qna" in intention:
+            answer = transport.chat_rag(question)
+        elif "statement_analysis" in intention:
+            analyze = transport.submit_analyze_pdf_job if asynchronous else transport.analyze_pdf
+            if uploaded_pdf:
+                uploaded_pdf.stream.seek(0)
+                result = analyze(question, uploaded_pdf.stream, uploaded_pdf.filename, uploaded_pdf.content_type)
+            elif statement_id:
+                result = analyze(question, statement_id=statement_id)
+            else:
+                return {"answer": "No hay PDF bro"}
+            if asynchronous and result:
+                return {"answer": JOB_ACCEPTED_RESPONSE, "job_id": result["job_id"]}
+            return result if result and result.get("answer") else {"answer": DEFAULT_RESPONSE}
+        elif "shop_advisor" in intention:
+            answer = transport.shopping_advisor(question)
+        else:
+            return {"answer": DEFAULT_RESPONSE}
+    except requests.RequestException:
+        return {"answer": DEFAULT_RESPONSE}
+
+    return {"answer": answer or DEFAULT_RESPONSE}
+
+
+def stream_assistant(intention: str, question: str, uploaded_pdf=None,
+                     statement_id: str | None = None) -> Iterator[str | bytes]:
+    transport = AssistantTransport.get_transport()
+    try:
+        if "chat_qna" in intention:
+            events = transport.stream_chat_rag(question)
+        elif "statement_analysis" in intention:
+            if uploaded_pdf:
+                uploaded_pdf.stream.seek(0)
+                events = transport.stream_analyze_pdf(question, uploaded_pdf.stream, uploaded_pdf.filename,
+                                                      uploaded_pdf.content_type)
+            elif statement_id:
+                events = transport.stream_analyze_pdf(question, statement_id=statement_id)
+            else:
+                yield from answer_events("No hay PDF bro", question)
+                return
+        elif "shop_advisor" in intention:
+            events = transport.stream_shopping_advisor(question)
+        else:
+            yield from answer_events(DEFAULT_RESPONSE, question)
+            return
+    except requests.RequestException:
+        yield from answer_events(DEFAULT_RESPONSE, question)
+        return
+
+    try:
+        yield from events
+    except requests.RequestException as error:
+        yield format_sse({"message": str(error)}, event="error")
+
+
+def speculative_dispatch(state: OrchestratorState):
+    if not any(intention in state["intention"] for intention in SPECULATIVE_INTENTIONS):
+        return {}
+    uploaded_pdf, statement_id = statement_context(state["intention"])
+    future = _speculative_executor.submit(call_assistant, state["intention"], state["question"], uploaded_pdf,
+                                          statement_id, asynchronous_requested())
+    SpeculationStats.increment("dispatched")
+    return {"speculative_call": future}
+
+
+def discard_speculative_call(state: OrchestratorState):
+    future = state.get("speculative_call")
+    if future is None:
+        return
+    if future.cancel():
+        SpeculationStats.increment("cancelled")
     else:
-        state["answer"] = DEFAULT_RESPONSE
+        SpeculationStats.increment("wasted")
+
+
+def route_intention(state: OrchestratorState):
+    future = state.get("speculative_call")
+    if future is not None:
+        state.update(future.result())
+        SpeculationStats.increment("used")
+        return state
 
+    uploaded_pdf, statement_id = statement_context(state["intention"])
+    state.update(call_assistant(state["intention"], state["question"], uploaded_pdf, statement_id,
+                                asynchronous_requested()))
     return state
 
 
-def build_orchestrator_graph() -> CompiledStateGraph:
+def canonical_intention(intention: str | None) -> str | None:
+    return next((label for label in INTENTIONS if intention and label in intention), None)
+
+
+def invoke_orchestrator(graph: CompiledStateGraph, question: str) -> dict:
+    """Return the answer, plus the statement_id to reuse for follow-up questions on an analyzed statement
+    or the job_id to poll when the analysis was queued."""
+    has_pdf = has_pdf_attachment()
+    classification = ResponseCache.get_classification(question, has_pdf) or {}
+    intention = canonical_intention(classification.get("intention"))
+    if intention and not has_pdf and "CONTINUE" in classification["guardrail_status"]:
+        answer = ResponseCache.get_answer(question, intention)
+        if answer is not None:
+            return {"answer": answer}
+
+    if has_pdf:
+        return run_orchestrator_graph(graph, question, has_pdf, classification)
+    return RequestCoalescer.do("orchestrate", normalize_text(question),
+                               lambda: run_orchestrator_graph(graph, question, has_pdf, classification))
+
+
+def run_orchestrator_graph(graph: CompiledStateGraph, question: str, has_pdf: bool, classification: dict) -> dict:
+    response = graph.invoke({"question": question, **classification})
+
+    classification = cache_classification(question, has_pdf, response)
+    intention = canonical_intention(classification.get("intention"))
+    if (intention and not has_pdf and "CONTINUE" in classification["guardrail_status"]
+            and response["answer"] != DEFAULT_RESPONSE):
+        ResponseCache.set_answer(question, intention, response["answer"])
+    return {key: response[key] for key in ("answer", "statement_id", "job_id") if response.get(key)}
+
+
+def cache_classification(question: str, has_pdf: bool, state: OrchestratorState) -> dict:
+    classification = {key: state[key] for key in ("guardrail_status", "intention") if state.get(key)}
+    if classification.get("guardrail_status"):
+        ResponseCache.set_classification(question, has_pdf, classification)
+    return classification
+
+
+def answer_events(answer: str, question: str) -> Iterator[str]:
+    yield format_sse({"token": answer})
+    yield format_sse({"question": question}, event="done")
+
+
+def stream_orchestrator(classification_graph: CompiledStateGraph, question: str) -> Iterator[str | bytes]:
+    """Classify the question, then relay the assistant's SSE stream as it is produced."""
+    has_pdf = has_pdf_attachment()
+    classification = ResponseCache.get_classification(question, has_pdf) or {}
+    intention = canonical_intention(classification.get("intention"))
+    if intention and not has_pdf and "CONTINUE" in classification["guardrail_status"]:
+        answer = ResponseCache.get_answer(question, intention)
+        if answer is not None:
+            yield from answer_events(answer, question)
+            return
+
+    state = classification_graph.invoke({"question": question, **classification})
+    cache_classification(question, has_pdf, state)
+    if "CONTINUE" not in state["guardrail_status"]:
+        yield from answer_events(state["answer"], question)
+        return
+
+    uploaded_pdf, statement_id = statement_context(state["intention"])
+    yield from stream_assistant(state["intention"], question, uploaded_pdf, statement_id)
+
+
+def build_orchestrator_graph(classification_mode: str | None = None, speculative: bool | None = None,
+                             dispatch: bool = True) -> CompiledStateGraph:
+    """With `dispatch=False` the graph only classifies; the caller is responsible for calling the assistant."""
+    mode = classification_mode or os.getenv("ORCHESTRATOR_CLASSIFICATION_MODE", "sequential")
+    if mode not in CLASSIFICATION_MODES:
+        raise ValueError(f"Unknown classification mode '{mode}', expected one of {CLASSIFICATION_MODES}")
+    if speculative is None:
+        speculative = os.getenv("ORCHESTRATOR_SPECULATIVE_DISPATCH", "false").lower() == "true"
+    speculative = speculative and dispatch
+
     graph_builder = StateGraph(OrchestratorState)
-    graph_builder.add_node("guardrail_topic_node", guardrail_topic)
-    graph_builder.add_node("intention_node", intention_node)
     graph_builder.add_node("default_response", default_response)
+    graph_builder.add_node("route_intention", route_intention if dispatch else skip_dispatch)
+
+    if mode == "combined":
+        # Guardrail and intention arrive together, so there is nothing to speculate on.
+        graph_builder.add_node("classify_node", classify_node)
+        graph_builder.add_edge(START, "classify_node")
+        guardrail_source, continue_node = "classify_node", "route_intention"
+    elif mode == "parallel":
+        graph_builder.add_node("guardrail_topic_node", guardrail_topic)
+        graph_builder.add_node("intention_node", intention_node)
+        graph_builder.add_node("join_classification", join_classification)
+        graph_builder.add_edge(START, "guardrail_topic_node")
+        graph_builder.add_edge(START, "intention_node")
+        intention_branch = "intention_node"
+        if speculative:
+            graph_builder.add_node("speculative_dispatch", speculative_dispatch)
+            graph_builder.add_edge("intention_node", "speculative_dispatch")
+            intention_branch = "speculative_dispatch"
+        graph_builder.add_edge(["guardrail_topic_node", intention_branch], "join_classification")
+        guardrail_source, continue_node = "join_classification", "route_intention"
+    elif speculative:
+        graph_builder.add_node("intention_node", intention_node)
+        graph_builder.add_node("speculative_dispatch", speculative_dispatch)
+        graph_builder.add_node("guardrail_topic_node", guardrail_topic)
+        graph_builder.add_edge(START, "intention_node")
+        graph_builder.add_edge("intention_node", "speculative_dispatch")
+        graph_builder.add_edge("speculative_dispatch", "guardrail_topic_node")
+        guardrail_source, continue_node = "guardrail_topic_node", "route_intention"
+    else:
+        graph_builder.add_node("guardrail_topic_node", guardrail_topic)
+        graph_builder.add_node("intention_node", intention_node)
+        graph_builder.add_edge("intention_node", "route_intention")
+        graph_builder.set_entry_point("guardrail_topic_node")
+        guardrail_source, continue_node = "guardrail_topic_node", "intention_node"
+
     graph_builder.add_conditional_edges(
-        "guardrail_topic_node",
+        guardrail_source,
         route_guardrail,
-        {"intention_node": "intention_node", "default_response": "default_response"}
+        {"continue": continue_node, "default_response": "default_response"}
     )
-    graph_builder.add_node("route_intention", route_intention)
-    graph_builder.add_edge("intention_node", "route_intention")
-    graph_builder.set_entry_point("guardrail_topic_node")
     return graph_builder.compile()
@@ -0,0 +1,8 @@
+import os
+import sys
+
+SERVICE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, SERVICE_PATH)
+# The shared `common` package lives at the repository root.
+sys.path.append(os.path.dirname(SERVICE_PATH))
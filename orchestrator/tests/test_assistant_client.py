@@ -0,0 +1,54 @@
+import time
+
+import pytest
+
+from extensions.assistant_client import AssistantClient, read_timeout_variable
+
+BASE_URL = "http://assistant:5000"
+
+
+@pytest.fixture(autouse=True)
+def assistant_client(monkeypatch):
+    monkeypatch.setenv("ASSISTANT_MICROSERVICE_URL", BASE_URL)
+    monkeypatch.setenv("ASSISTANT_READ_TIMEOUT_RAG_STREAM", "12")
+    monkeypatch.setattr(AssistantClient, "_session", None)
+    AssistantClient.init_app()
+    yield
+    AssistantClient._session = None
+
+
+def retries(path: str) -> int:
+    return AssistantClient._session.get_adapter(f"{BASE_URL}{path}").max_retries.total
+
+
+def test_only_idempotent_endpoints_are_retried():
+    assert retries("/api/v1/rag") == 2
+    assert retries("/api/v1/shopping-advisor") == 2
+    assert retries("/api/v1/rag/batch") == 0
+    assert retries("/api/v1/rag/stream") == 0
+    assert retries("/api/v1/shopping-advisor/stream") == 0
+    assert retries("/api/v1/analyze-pdf") == 0
+    assert retries("/api/v1/analyze-pdf/jobs/0123") == 0
+
+
+def test_stream_endpoints_have_their_own_read_timeouts():
+    assert read_timeout_variable("/api/v1/analyze-pdf/stream") == "ASSISTANT_READ_TIMEOUT_ANALYZE_PDF_STREAM"
+    assert AssistantClient._read_timeouts["/api/v1/rag/stream"] == 12
+    assert AssistantClient._read_timeouts["/api/v1/analyze-pdf/stream"] == 180
+
+
+def test_a_trial_failing_outside_requests_does_not_wedge_the_circuit(monkeypatch):
+    breaker = AssistantClient._breaker
+    for _ in range(5):
+        breaker.record_failure()
+    monkeypatch.setattr(breaker, "_opened_at", time.monotonic() - 60)
+
+    def broken_request(*args, **kwargs):
+        raise TypeError("unexpected keyword argument")
+
+    monkeypatch.setattr(AssistantClient._session, "request", broken_request)
+    with pytest.raises(TypeError):
+        AssistantClient.post("/api/v1/rag", json={"question": "q"})
+
+    assert breaker.state() == "open"
+    assert breaker.allow_request()
@@ -0,0 +1,62 @@
+import builtins
+import importlib
+import sys
+
+import pytest
+
+from extensions import llm
+from extensions.assistant_client import AssistantClient
+from extensions.assistant_transport import HttpTransport, load_assistant_package
+
+
+@pytest.fixture
+def fake_assistant(monkeypatch, tmp_path):
+    extensions = tmp_path / "fake_assistant" / "extensions"
+    extensions.mkdir(parents=True)
+    (tmp_path / "fake_assistant" / "__init__.py").write_text("")
+    (extensions / "rate_limiter.py").write_text("OWNER = 'assistant'\n")
+    (extensions / "llm.py").write_text("from .rate_limiter import OWNER\n")
+    monkeypatch.setattr(sys, "path", list(sys.path))
+    modules = set(sys.modules)
+    yield tmp_path / "fake_assistant"
+    for name in set(sys.modules) - modules:
+        del sys.modules[name]
+
+
+def test_assistant_modules_do_not_shadow_orchestrator_ones(fake_assistant):
+    import_function = builtins.__import__
+
+    package = load_assistant_package(str(fake_assistant))
+    assistant_llm = importlib.import_module(f"{package}.extensions.llm")
+
+    assert package == "fake_assistant"
+    assert assistant_llm is not llm
+    assert assistant_llm.OWNER == "assistant"
+    assert importlib.import_module("extensions.llm") is llm
+    assert builtins.__import__ is import_function
+
+
+def test_a_package_name_resolving_elsewhere_is_rejected(fake_assistant, tmp_path):
+    load_assistant_package(str(fake_assistant))
+    other = tmp_path / "other" / "fake_assistant"
+    other.mkdir(parents=True)
+    (other / "__init__.py").write_text("")
+
+    with pytest.raises(ValueError):
+        load_assistant_package(str(other))
+
+
+def test_http_batch_forwards_max_concurrency(monkeypatch):
+    requests_sent = []
+
+    class Response:
+        status_code = 200
+
+        @staticmethod
+        def json():
+            return {"results": [{"question": "q", "response": "a"}]}
+
+    monkeypatch.setattr(AssistantClient, "post", lambda path, **kwargs: requests_sent.append((path, kwargs)) or Response)
+
+    assert HttpTransport().batch_chat_rag(["q"], max_concurrency=3) == [{"question": "q", "response": "a"}]
+    assert requests_sent == [("/api/v1/rag/batch", {"json": {"questions": ["q"], "max_concurrency": 3}})]
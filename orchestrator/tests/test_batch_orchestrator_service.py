@@ -0,0 +1,26 @@
+import requests
+
+from extensions.assistant_transport import AssistantTransport
+from services.batch_orchestrator_service import batch_shopping_advisor
+
+
+class FlakyTransport:
+    def shopping_advisor(self, question: str) -> str | None:
+        if "timeout" in question:
+            raise requests.ReadTimeout("read timed out")
+        if "graph" in question:
+            raise ValueError("graph failed")
+        if "5xx" in question:
+            return None
+        return f"answer to {question}"
+
+
+def test_shopping_advisor_failures_are_reported_per_item(monkeypatch):
+    monkeypatch.setattr(AssistantTransport, "_transport", FlakyTransport())
+
+    results = batch_shopping_advisor(["laptop", "timeout", "graph", "5xx"], max_concurrency=2)
+
+    assert results[0] == {"question": "laptop", "response": "answer to laptop"}
+    assert results[1] == {"question": "timeout", "error": "read timed out"}
+    assert results[2] == {"question": "graph", "error": "graph failed"}
+    assert results[3]["question"] == "5xx" and "error" in results[3]